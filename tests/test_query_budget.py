@@ -0,0 +1,34 @@
+from unittest import mock
+
+import pytest
+from django.urls import resolve, reverse
+
+from core.query_budget import assert_constant_queries
+from posts.models import Follow, Post
+from posts.tests.utils import grow_posts
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('name', ['posts:index', 'posts:follow_index'])
+    def test_feed_queries_do_not_grow(self, user_client, user, another_user,
+                                      group, name):
+        Follow.objects.create(user=user, author=another_user)
+        commented = Post.objects.create(text='Пост', author=another_user)
+
+        def populate(size):
+            grow_posts(size, another_user, group, user, commented)
+
+        url = reverse(name)
+        view_class = resolve(url).func.view_class
+
+        def request(size):
+            # На странице столько постов, сколько их в наборе данных:
+            # лишний запрос на пост растёт вместе с ним
+            with mock.patch.object(view_class, 'paginate_by', size):
+                response = user_client.get(url)
+            assert response.status_code == 200
+            assert len(response.context['page_obj']) == size
+
+        assert_constant_queries(request, populate, label=name)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.tasks import TASK_WORKER_THREADS, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в пуле потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int,
+                            default=TASK_WORKER_THREADS,
+                            help='Число потоков, выполняющих задачи')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза между проверками пустой очереди, с')
+        parser.add_argument('--once', action='store_true',
+                            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        run_worker(threads=options['threads'],
+                   poll_interval=options['poll_interval'],
+                   once=options['once'])
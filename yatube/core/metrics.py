@@ -0,0 +1,106 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+from django.conf import settings
+
+# Гистограммы запросов по имени представления (posts:index, ...),
+# которые собирает core.middleware.MetricsMiddleware. Хранятся
+# в памяти процесса: каждый процесс сервера отдаёт свои
+SECONDS_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                                      0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# {имя метрики: (описание, границы корзин)}
+METRICS: Dict[str, Tuple[str, Sequence[float]]] = {
+    'yatube_request_duration_seconds':
+        ('Время ответа на запрос', SECONDS_BUCKETS),
+    'yatube_db_queries':
+        ('Запросов к базе за запрос', QUERIES_BUCKETS),
+    'yatube_db_duration_seconds':
+        ('Время запросов к базе за запрос', SECONDS_BUCKETS),
+    'yatube_template_render_seconds':
+        ('Время отрисовки шаблона', SECONDS_BUCKETS),
+}
+
+# Метрики видны только с этих адресов, по умолчанию - с INTERNAL_IPS
+METRICS_ALLOWED_IPS: Sequence[str] = getattr(settings, 'METRICS_ALLOWED_IPS',
+                                             settings.INTERNAL_IPS)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense.
+
+    Parameters
+    ---------------
+    buckets: Upper bounds of the buckets, ascending; the +Inf bucket
+    is added implicitly.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self) -> List[Tuple[str, float]]:
+        """Returns (le, cumulative count) pairs, +Inf last."""
+        samples, total = [], 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            samples.append(('+Inf' if bound == float('inf')
+                            else repr(float(bound)), total))
+        return samples
+
+
+class MetricsRegistry:
+    """Histograms of METRICS per view.
+
+    Observations take one lock for a few increments, so recording
+    stays cheap under load."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views: Dict[str, Dict[str, Histogram]] = {}
+
+    def observe(self, view: str, values: Dict[str, float]):
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = {
+                    name: Histogram(buckets)
+                    for name, (help_text, buckets) in METRICS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text format."""
+        with self.lock:
+            snapshot = {view: {name: (histogram.samples(), histogram.sum)
+                               for name, histogram in histograms.items()}
+                        for view, histograms in self.views.items()}
+
+        lines = []
+        for name, (help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for view in sorted(snapshot):
+                samples, total = snapshot[view][name]
+                label = view.replace('\\', '\\\\').replace('"', '\\"')
+                for bound, count in samples:
+                    lines.append(f'{name}_bucket{{view="{label}",'
+                                 f'le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{view="{label}"}} {total}')
+                lines.append(f'{name}_count{{view="{label}"}} '
+                             f'{samples[-1][1]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
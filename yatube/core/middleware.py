@@ -0,0 +1,89 @@
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+from .slow_queries import SLOW_QUERY_THRESHOLD, SlowQueryLogger
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Records latency, database queries and template render time
+    of every request by its resolved view name, see core.metrics.
+
+    Works without DEBUG: queries are counted by an execute wrapper,
+    not by connection.queries. Should be the first middleware, so the
+    latency covers the others too."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        values = {
+            'yatube_request_duration_seconds': time.perf_counter() - start,
+            'yatube_db_queries': counter.queries,
+            'yatube_db_duration_seconds': counter.duration,
+        }
+        render_started = getattr(request, '_render_started', None)
+        render_finished = getattr(request, '_render_finished', None)
+        if render_started is not None and render_finished is not None:
+            values['yatube_template_render_seconds'] = (render_finished
+                                                        - render_started)
+
+        match = getattr(request, 'resolver_match', None)
+        registry.observe(match.view_name if match else UNRESOLVED_VIEW,
+                         values)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответ отрисуется сразу после обработчиков шаблонных ответов
+        request._render_started = time.perf_counter()
+
+        def render_finished(response):
+            request._render_finished = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Logs slow queries of requests with their plans, see
+    core.slow_queries. Turned off unless SLOW_QUERY_THRESHOLD is set."""
+
+    def __init__(self, get_response):
+        if SLOW_QUERY_THRESHOLD is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    SlowQueryLogger(SLOW_QUERY_THRESHOLD, request,
+                                    connection.alias)))
+            return self.get_response(request)
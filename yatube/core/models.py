@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Deferred call of a function registered with core.tasks.task."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    # JSON: {"args": [...], "kwargs": {...}}
+    arguments = models.TextField('Аргументы', default='{}')
+    status = models.CharField('Состояние', max_length=10,
+                              choices=STATUSES, default=QUEUED)
+    idempotency_key = models.CharField('Ключ идемпотентности',
+                                       max_length=255,
+                                       unique=True,
+                                       null=True,
+                                       blank=True)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=3)
+    run_at = models.DateTimeField('Выполнить после')
+    locked_at = models.DateTimeField('Взята в работу', null=True,
+                                     blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        # Выборка очередной задачи: status = queued ORDER BY run_at
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='task_status_run_at_idx'),
+        ]
@@ -0,0 +1,112 @@
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import connection
+
+# Проверка, что число запросов страницы не растёт с объёмом данных:
+# страница запрашивается при нескольких размерах набора данных,
+# лишние запросы выводятся вместе со строками шаблонов, которые их
+# вызвали. Пользоваться можно и из pytest, и из TestCase
+QUERY_BUDGET_SIZES: Tuple[int, ...] = (10, 100, 1000)
+
+# Значения в SQL не важны для сравнения запросов
+LITERALS = re.compile(r"'[^']*'|\b\d+\b")
+
+
+def template_location() -> Optional[str]:
+    """Returns 'template:line' of the innermost template node being
+    rendered in the current thread, or None outside of templates."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name or origin.name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryLog:
+    """Database execute wrapper recording (sql, template location)
+    of the queries."""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, Optional[str]]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, template_location()))
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def log_queries() -> Iterator[QueryLog]:
+    log = QueryLog()
+    with connection.execute_wrapper(log):
+        yield log
+
+
+def queries_by_size(request: Callable[[int], object],
+                    populate: Callable[[int], None],
+                    sizes: Sequence[int] = QUERY_BUDGET_SIZES
+                    ) -> Dict[int, List[Tuple[str, Optional[str]]]]:
+    """Returns the queries of request(size) for every dataset size.
+
+    populate(size) grows the dataset to size, request(size) gets the
+    page. The page is requested once to make whatever it creates
+    lazily, then measured with an empty cache."""
+    queries = {}
+    for size in sorted(sizes):
+        populate(size)
+        request(size)
+        cache.clear()
+        with log_queries() as log:
+            request(size)
+        queries[size] = log.queries
+    return queries
+
+
+def extra_queries(smaller: List[Tuple[str, Optional[str]]],
+                  larger: List[Tuple[str, Optional[str]]]) -> List[str]:
+    """Describes the queries the larger run made in excess,
+    grouped by template location."""
+    def signatures(queries):
+        return Counter((location or 'вне шаблона', LITERALS.sub('?', sql))
+                       for sql, location in queries)
+
+    excess = signatures(larger) - signatures(smaller)
+    return [f'{location} x{count}: {sql}'
+            for (location, sql), count in sorted(excess.items())]
+
+
+def assert_constant_queries(request: Callable[[int], object],
+                            populate: Callable[[int], None],
+                            sizes: Sequence[int] = QUERY_BUDGET_SIZES,
+                            label: str = ''):
+    """Raises AssertionError if the number of queries of the page
+    depends on the dataset size, see queries_by_size."""
+    queries = queries_by_size(request, populate, sizes)
+    counts = {size: len(logged) for size, logged in queries.items()}
+    smallest, largest = min(queries), max(queries)
+    if len(set(counts.values())) == 1:
+        return
+    extra = extra_queries(queries[smallest], queries[largest])
+    raise AssertionError(
+        f'{label or "Страница"}: число запросов растёт с данными '
+        f'{counts}. Лишние запросы:\n  ' + '\n  '.join(extra))
+
+
+class QueryBudgetMixin:
+    """TestCase mixin with assertConstantQueries."""
+
+    def assertConstantQueries(self, request, populate,
+                              sizes=QUERY_BUDGET_SIZES, label=''):
+        try:
+            assert_constant_queries(request, populate, sizes, label)
+        except AssertionError as e:
+            self.fail(str(e))
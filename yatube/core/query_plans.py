@@ -0,0 +1,20 @@
+from typing import List
+
+from django.db import connections
+
+
+def explain(sql: str, params=None, using: str = 'default') -> List[str]:
+    """Returns EXPLAIN QUERY PLAN steps of the SQLite query."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params or ())
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan: List[str]) -> List[str]:
+    """Returns steps of the plan that read a whole table
+    or sort rows in a temporary B-tree."""
+    return [step for step in plan
+            if 'TEMP B-TREE' in step
+            or (step.startswith('SCAN')
+                and 'USING' not in step
+                and 'SUBQUERY' not in step.upper())]
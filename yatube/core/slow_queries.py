@@ -0,0 +1,142 @@
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .query_plans import explain, plan_problems
+
+logger = logging.getLogger(__name__)
+
+# Журнал медленных запросов: запрос дольше SLOW_QUERY_THRESHOLD секунд
+# пишется в лог с планом выполнения, представлением и строкой кода,
+# которая его выполнила. None - журнал выключен
+SLOW_QUERY_THRESHOLD: Optional[float] = getattr(
+    settings, 'SLOW_QUERY_THRESHOLD', None)
+# Один и тот же запрос пишется не чаще раза в столько секунд
+SLOW_QUERY_SAMPLE_INTERVAL: float = getattr(
+    settings, 'SLOW_QUERY_SAMPLE_INTERVAL', 60)
+SLOW_QUERY_MAX_STATEMENTS: int = 1000
+
+# Списки параметров IN (%s, %s, ...) разной длины - один запрос
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+# Кадры журнала и middleware, которые есть в стеке любого запроса
+IGNORED_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                 'middleware.py'),
+}
+
+
+def statement_fingerprint(sql: str) -> str:
+    return IN_LIST.sub('(...)', sql)
+
+
+def query_site(base_dir: str = settings.BASE_DIR) -> Optional[str]:
+    """Returns 'path:line in function' of the innermost project frame
+    of the current stack, outside of this module."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(base_dir)
+                and filename not in IGNORED_FILES
+                and os.sep + 'site-packages' + os.sep not in filename):
+            path = os.path.relpath(filename, base_dir)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class StatementSampler:
+    """Decides which slow statements to log: each fingerprint once per
+    interval, the skipped ones are counted and reported with the next.
+
+    Parameters
+    ---------------
+    interval: Seconds between two records of one statement.
+    max_statements: Number of fingerprints to remember.
+    """
+
+    def __init__(self, interval: float, max_statements: int):
+        self.interval = interval
+        self.max_statements = max_statements
+        self.lock = threading.Lock()
+        self.statements: Dict[str, Tuple[float, int]] = {}
+
+    def sample(self, fingerprint: str) -> Optional[int]:
+        """Returns the number of skipped records of the statement
+        if it should be logged now, otherwise None."""
+        now = time.monotonic()
+        with self.lock:
+            logged_at, skipped = self.statements.get(fingerprint,
+                                                     (None, 0))
+            if logged_at is not None and now - logged_at < self.interval:
+                self.statements[fingerprint] = (logged_at, skipped + 1)
+                return None
+            if len(self.statements) >= self.max_statements:
+                self.statements.clear()
+            self.statements[fingerprint] = (now, 0)
+            return skipped
+
+
+sampler = StatementSampler(SLOW_QUERY_SAMPLE_INTERVAL,
+                           SLOW_QUERY_MAX_STATEMENTS)
+
+
+class SlowQueryLogger:
+    """Database execute wrapper logging queries slower than threshold.
+
+    Everything beyond timing is done only for slow queries, and for
+    one statement only once per sampling interval.
+
+    Parameters
+    ---------------
+    threshold: Duration of a slow query, seconds.
+    request: Request running the queries, its view is logged.
+    using: Database alias, EXPLAIN runs there.
+    """
+    explaining = threading.local()
+
+    def __init__(self, threshold: float, request=None,
+                 using: str = 'default'):
+        self.threshold = threshold
+        self.request = request
+        self.using = using
+
+    @property
+    def view(self) -> str:
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else ''
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if (duration >= self.threshold
+                    and not getattr(self.explaining, 'active', False)):
+                self.log(sql, params, many, duration)
+
+    def log(self, sql: str, params, many: bool, duration: float):
+        skipped = sampler.sample(statement_fingerprint(sql))
+        if skipped is None:
+            return
+        plan = []
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            self.explaining.active = True
+            try:
+                plan = explain(sql, params, self.using)
+            except Exception as e:
+                plan = [f'EXPLAIN не удался: {e}']
+            finally:
+                self.explaining.active = False
+        view = self.view
+        logger.warning(
+            'Slow query %.3fs in %s at %s (skipped since last: %d)\n'
+            '%s\nPlan:\n  %s\nProblems: %s',
+            duration, view or '-', query_site() or '-', skipped,
+            sql, '\n  '.join(plan), '; '.join(plan_problems(plan)) or '-',
+            extra={'duration': duration, 'view': view, 'sql': sql})
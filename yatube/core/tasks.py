@@ -0,0 +1,249 @@
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Очередь фоновых задач в базе: код запроса ставит задачу вызовом
+# task.delay(...) в той же транзакции, что и свои изменения,
+# выполняет их команда run_task_worker
+TASK_QUEUE_MAX_SIZE: int = getattr(settings, 'TASK_QUEUE_MAX_SIZE', 10000)
+TASK_WORKER_THREADS: int = getattr(settings, 'TASK_WORKER_THREADS', 4)
+TASK_RETRY_DELAY: int = getattr(settings, 'TASK_RETRY_DELAY', 30)
+TASK_LOCK_TIMEOUT: int = getattr(settings, 'TASK_LOCK_TIMEOUT', 10 * 60)
+# Выполненные и упавшие задачи хранятся столько секунд
+TASK_RETENTION: int = getattr(settings, 'TASK_RETENTION', 7 * 24 * 60 * 60)
+# Как часто обработчик удаляет старые задачи, секунды
+TASK_CLEANUP_INTERVAL: int = getattr(settings, 'TASK_CLEANUP_INTERVAL',
+                                     60 * 60)
+
+
+class QueueFull(Exception):
+    """Raised by enqueue when TASK_QUEUE_MAX_SIZE tasks are waiting."""
+
+
+def task(max_attempts: int = 3) -> Callable:
+    """Decorator making a module level function a background task.
+
+    The function keeps working as usual and gets ``delay`` and
+    ``delay_many`` methods queueing its calls. Arguments must be JSON
+    serializable.
+
+    Usage:
+        @task(max_attempts=5)
+        def send_email(subject, body, recipients): ...
+
+        send_email.delay('Hi', 'Text', ['a@b.c'], idempotency_key=key)
+    """
+    def decorator(func: Callable) -> Callable:
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(*args, idempotency_key: Optional[str] = None,
+                  **kwargs) -> Task:
+            return enqueue(name, args, kwargs,
+                           idempotency_key=idempotency_key,
+                           max_attempts=max_attempts)
+
+        def delay_many(calls: Iterable[Tuple[tuple, Optional[str]]]):
+            enqueue_many(name, calls, max_attempts=max_attempts)
+
+        func.task_name = name
+        func.delay = delay
+        func.delay_many = delay_many
+        return func
+    return decorator
+
+
+def check_queue_size(adding: int = 1):
+    queued = Task.objects.filter(status=Task.QUEUED).count()
+    if queued + adding > TASK_QUEUE_MAX_SIZE:
+        raise QueueFull(f'В очереди уже {queued} задач')
+
+
+def _new_task(name: str, args, kwargs, idempotency_key: Optional[str],
+              max_attempts: int) -> Task:
+    return Task(name=name,
+                arguments=json.dumps({'args': list(args),
+                                      'kwargs': kwargs}),
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts,
+                run_at=timezone.now())
+
+
+def enqueue(name: str, args=(), kwargs=None,
+            idempotency_key: Optional[str] = None,
+            max_attempts: int = 3) -> Task:
+    """Queues the call of the task function by its dotted name.
+
+    A task with the same idempotency_key is queued only once: the
+    existing one is returned. Raises QueueFull if the queue is full."""
+    if idempotency_key is not None:
+        existing = Task.objects.filter(
+            idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+    check_queue_size()
+    new_task = _new_task(name, args, kwargs or {}, idempotency_key,
+                         max_attempts)
+    try:
+        with transaction.atomic():
+            new_task.save()
+    except IntegrityError:
+        # Ту же задачу только что поставил параллельный запрос
+        return Task.objects.get(idempotency_key=idempotency_key)
+    return new_task
+
+
+def enqueue_many(name: str, calls: Iterable[Tuple[tuple, Optional[str]]],
+                 max_attempts: int = 3):
+    """Queues many calls of the task function at once.
+
+    calls are (args, idempotency_key) pairs, calls with already
+    queued keys are skipped."""
+    new_tasks = [_new_task(name, args, {}, key, max_attempts)
+                 for args, key in calls]
+    if not new_tasks:
+        return
+    check_queue_size(len(new_tasks))
+    Task.objects.bulk_create(new_tasks, ignore_conflicts=True)
+
+
+def requeue_stale_tasks() -> int:
+    """Returns to the queue tasks of workers that died running them,
+    the ones out of attempts are marked failed."""
+    stale = (Task.
+             objects.
+             filter(status=Task.RUNNING,
+                    locked_at__lt=timezone.now() - timedelta(
+                        seconds=TASK_LOCK_TIMEOUT)))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, locked_at=None,
+        last_error='Обработчик задачи не завершил её')
+    return stale.update(status=Task.QUEUED, locked_at=None)
+
+
+def delete_finished_tasks(retention: int = TASK_RETENTION) -> int:
+    """Deletes done and failed tasks older than retention seconds,
+    returns how many were deleted."""
+    deleted, _ = (Task.
+                  objects.
+                  filter(status__in=(Task.DONE, Task.FAILED),
+                         run_at__lt=timezone.now() - timedelta(
+                             seconds=retention)).
+                  delete())
+    return deleted
+
+
+def claim_task() -> Optional[Task]:
+    """Takes the next due task, or returns None if there is none.
+
+    Several workers may claim concurrently: the conditional UPDATE
+    lets only one of them get a task."""
+    while True:
+        candidate = (Task.
+                     objects.
+                     filter(status=Task.QUEUED, run_at__lte=timezone.now()).
+                     order_by('run_at').
+                     values_list('pk', flat=True).
+                     first())
+        if candidate is None:
+            return None
+        claimed = (Task.
+                   objects.
+                   filter(pk=candidate, status=Task.QUEUED).
+                   update(status=Task.RUNNING,
+                          attempts=F('attempts') + 1,
+                          locked_at=timezone.now()))
+        if claimed:
+            return Task.objects.get(pk=candidate)
+
+
+def run_task(claimed: Task):
+    """Runs the claimed task and stores the result. Failed tasks are
+    retried with exponential backoff until max_attempts."""
+    try:
+        func = import_string(claimed.name)
+        arguments = json.loads(claimed.arguments)
+        func(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        logger.exception('Task %s failed', claimed)
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts:
+            delay = TASK_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            claimed.status = Task.QUEUED
+            claimed.run_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            claimed.status = Task.FAILED
+    else:
+        claimed.status = Task.DONE
+    claimed.locked_at = None
+    claimed.save(update_fields=['status', 'run_at', 'locked_at',
+                                'last_error'])
+
+
+def run_next_task() -> bool:
+    """Claims and runs one task in the current thread.
+    Returns False if the queue has no due tasks."""
+    claimed = claim_task()
+    if claimed is None:
+        return False
+    run_task(claimed)
+    return True
+
+
+def drain_tasks() -> int:
+    """Runs due tasks in the current thread until none is left,
+    returns how many were run."""
+    done = 0
+    while run_next_task():
+        done += 1
+    return done
+
+
+def _run_in_thread(claimed: Task):
+    try:
+        run_task(claimed)
+    finally:
+        close_old_connections()
+
+
+def run_worker(threads: int = TASK_WORKER_THREADS,
+               poll_interval: float = 1.0,
+               once: bool = False):
+    """Claims tasks in the current thread and runs them in a pool.
+
+    With once the worker stops when the queue has no due tasks,
+    otherwise it polls the queue every poll_interval seconds.
+    Finished tasks are deleted every TASK_CLEANUP_INTERVAL seconds."""
+    with ThreadPoolExecutor(max_workers=threads,
+                            thread_name_prefix='tasks') as pool:
+        running = set()
+        cleaned_at = None
+        while True:
+            running = {future for future in running if not future.done()}
+            claimed = None
+            if len(running) < threads:
+                claimed = claim_task()
+            if claimed is not None:
+                running.add(pool.submit(_run_in_thread, claimed))
+                continue
+            if once and not running:
+                return
+            requeue_stale_tasks()
+            if (cleaned_at is None
+                    or time.monotonic() - cleaned_at >= TASK_CLEANUP_INTERVAL):
+                delete_finished_tasks()
+                cleaned_at = time.monotonic()
+            time.sleep(poll_interval)
@@ -0,0 +1,55 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.metrics import Histogram, registry
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        registry.clear()
+        self.client = Client()
+
+    def sample(self, text, metric, view):
+        match = re.search(rf'^{metric}{{view="{view}"}} (\S+)$', text,
+                          re.MULTILINE)
+        return float(match.group(1))
+
+    def test_histogram(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEquals(histogram.samples(),
+                          [('1.0', 2), ('5.0', 3), ('+Inf', 4)])
+        self.assertEquals(histogram.sum, 14)
+
+    def test_views_are_measured(self):
+        author = User.objects.create_user("author")
+        Post.objects.create(text="Пост", author=author)
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/no/such/page/')
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertEquals(self.sample(
+            text, 'yatube_request_duration_seconds_count', 'posts:index'), 2)
+        self.assertGreater(self.sample(
+            text, 'yatube_db_queries_sum', 'posts:index'), 0)
+        self.assertEquals(self.sample(
+            text, 'yatube_template_render_seconds_count', 'posts:index'), 2)
+        self.assertEquals(self.sample(
+            text, 'yatube_request_duration_seconds_count', '<unresolved>'),
+            1)
+        self.assertIn('# TYPE yatube_db_queries histogram', text)
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",le="+Inf"}'
+                      ' 2', text)
+
+    def test_metrics_are_not_public(self):
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='203.0.113.1')
+        self.assertEquals(response.status_code, 403)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import resolve
+
+from core.slow_queries import (SlowQueryLogger, StatementSampler, sampler,
+                               statement_fingerprint)
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self) -> None:
+        sampler.statements.clear()
+
+    def test_slow_query_is_logged_with_plan(self):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            with connection.execute_wrapper(SlowQueryLogger(0, request)):
+                list(Post.objects.filter(text='Пост'))
+        self.assertEquals(len(logs.output), 1)
+        record = logs.output[0]
+        self.assertIn('in posts:index', record)
+        self.assertIn('core/tests/test_slow_queries.py', record)
+        self.assertIn('SCAN', record)
+
+    def test_same_statement_is_sampled(self):
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            with connection.execute_wrapper(SlowQueryLogger(0)):
+                for pks in ([1], [1, 2], [1, 2, 3]):
+                    list(Post.objects.filter(pk__in=pks))
+        self.assertEquals(len(logs.output), 1)
+
+    def test_fast_queries_are_not_logged(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.slow_queries', 'WARNING'):
+                with connection.execute_wrapper(SlowQueryLogger(10)):
+                    list(Post.objects.all())
+
+    def test_sampler(self):
+        statements = StatementSampler(interval=60, max_statements=10)
+        self.assertEquals(statements.sample('a'), 0)
+        self.assertIsNone(statements.sample('a'))
+        self.assertIsNone(statements.sample('a'))
+        statements.interval = 0
+        self.assertEquals(statements.sample('a'), 2)
+        self.assertEquals(statement_fingerprint('id IN (%s, %s)'),
+                          'id IN (...)')
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from core.tasks import (QueueFull, delete_finished_tasks, drain_tasks,
+                        requeue_stale_tasks, run_next_task, task)
+
+CALLS = []
+
+
+@task()
+def remember(value, twice=False):
+    CALLS.append(value)
+    if twice:
+        CALLS.append(value)
+
+
+@task(max_attempts=2)
+def fail():
+    raise ValueError('Ошибка задачи')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self) -> None:
+        CALLS.clear()
+
+    def test_delayed_call_is_run_by_worker(self):
+        remember.delay('first', twice=True)
+        remember.delay('second')
+        self.assertEquals(CALLS, [])
+
+        self.assertEquals(drain_tasks(), 2)
+        self.assertEquals(CALLS, ['first', 'first', 'second'])
+        self.assertEquals(Task.objects.filter(status=Task.DONE).count(), 2)
+
+    def test_idempotency_key(self):
+        first = remember.delay('value', idempotency_key='remember:1')
+        second = remember.delay('value', idempotency_key='remember:1')
+        remember.delay_many([(('value',), 'remember:1'),
+                             (('other',), 'remember:2')])
+        self.assertEquals(first.pk, second.pk)
+
+        drain_tasks()
+        self.assertEquals(CALLS, ['value', 'other'])
+
+    def test_retries(self):
+        failing = fail.delay()
+        self.assertTrue(run_next_task())
+        failing.refresh_from_db()
+        self.assertEquals(failing.status, Task.QUEUED)
+        self.assertEquals(failing.attempts, 1)
+        self.assertIn('Ошибка задачи', failing.last_error)
+        # Повтор отложен
+        self.assertFalse(run_next_task())
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertTrue(run_next_task())
+        failing.refresh_from_db()
+        self.assertEquals(failing.status, Task.FAILED)
+
+    def test_bounded_queue(self):
+        max_size = tasks.TASK_QUEUE_MAX_SIZE
+        tasks.TASK_QUEUE_MAX_SIZE = 1
+        try:
+            remember.delay('first')
+            with self.assertRaises(QueueFull):
+                remember.delay('second')
+        finally:
+            tasks.TASK_QUEUE_MAX_SIZE = max_size
+
+    def test_stale_tasks_are_requeued(self):
+        stale = remember.delay('stale')
+        Task.objects.update(
+            status=Task.RUNNING,
+            attempts=1,
+            locked_at=timezone.now() - timedelta(days=1))
+        self.assertEquals(requeue_stale_tasks(), 1)
+        stale.refresh_from_db()
+        self.assertEquals(stale.status, Task.QUEUED)
+
+    def test_finished_tasks_are_deleted(self):
+        remember.delay('done')
+        drain_tasks()
+        remember.delay('queued')
+        Task.objects.update(run_at=timezone.now() - timedelta(days=30))
+        self.assertEquals(delete_finished_tasks(retention=60), 1)
+        self.assertEquals(Task.objects.get().status, Task.QUEUED)
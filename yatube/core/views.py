@@ -1,5 +1,8 @@
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 
+from .metrics import METRICS_ALLOWED_IPS, registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +18,11 @@ def handler_403(request, exception):
 
 def handler_500(request):
     return render(request, 'core/500.html')
+
+
+def metrics(request):
+    """Metrics of the process in the Prometheus text format."""
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Group, Comment
+from .search import search_post_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
 
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%q%'
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_post_ids(search_term)), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'author', 'post', 'text')
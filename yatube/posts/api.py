@@ -0,0 +1,252 @@
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.generic import View
+
+from .counters import get_profile
+from .models import Comment, Group, Post, TimelineEntry
+from .paginators import CursorPaginator
+
+User = get_user_model()
+
+API_PAGE_SIZE: int = getattr(settings, 'API_PAGE_SIZE', 20)
+API_MAX_PAGE_SIZE: int = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+# Поля ответов API: {имя поля в JSON: путь для values()}.
+# Ответы собираются из values(), без создания объектов моделей
+POST_FIELDS: Dict[str, str] = {
+    'id': 'pk',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS: Dict[str, str] = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS: Dict[str, str] = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+PROFILE_FIELDS: Dict[str, str] = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'profile__posts_count',
+    'followers_count': 'profile__followers_count',
+    'following_count': 'profile__following_count',
+}
+
+image_storage = Post._meta.get_field('image').storage
+
+
+def image_url(name: str) -> Optional[str]:
+    return image_storage.url(name) if name else None
+
+
+# Преобразования значений полей по пути values()
+CONVERTERS = {'image': image_url}
+
+
+class ApiError(Exception):
+    """Raised by API views for a bad request, answered with 400."""
+
+
+def select_fields(request, fields: Dict[str, str]) -> Dict[str, str]:
+    """Returns the fields listed in ``?fields=a,b``, all by default."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return fields
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: fields[name] for name in names}
+
+
+def page_size(request) -> int:
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(size, API_MAX_PAGE_SIZE))
+
+
+def serialize(row: Dict, fields: Dict[str, str]) -> Dict:
+    """Turns a values() row into the API object."""
+    data = {}
+    for name, path in fields.items():
+        value = row[path]
+        converter = CONVERTERS.get(path.rsplit('__', 1)[-1])
+        data[name] = converter(value) if converter else value
+    return data
+
+
+def paginate(request, queryset, fields: Dict[str, str],
+             seek_fields: Tuple[str, str] = ('created', 'pk')) -> Dict:
+    """Returns a keyset page of the queryset rows as
+    {"results": [...], "next": cursor of the next page or null}.
+
+    The rows are read with values() of the fields and the seek fields
+    only, see posts.paginators.CursorPaginator."""
+    paths = {*fields.values(), *seek_fields}
+    paginator = CursorPaginator(queryset.values(*paths), page_size(request),
+                                seek_fields)
+    try:
+        page = paginator.page(request.GET.get('after'))
+    except InvalidPage as e:
+        raise ApiError(str(e))
+    return {'results': [serialize(row, fields) for row in page],
+            'next': page.next_cursor}
+
+
+class ApiView(View):
+    """Base of the read-only JSON API views: get_data returns
+    the response data, errors are answered with JSON too."""
+
+    def get_data(self, request, **kwargs) -> Dict:
+        raise NotImplementedError
+
+    def get(self, request, **kwargs):
+        try:
+            return JsonResponse(self.get_data(request, **kwargs),
+                                json_dumps_params={'ensure_ascii': False})
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено'}, status=404)
+
+
+class PostListApiView(ApiView):
+    """Posts of the index, newest first."""
+
+    def get_queryset(self, **kwargs):
+        return Post.objects.all()
+
+    def get_data(self, request, **kwargs):
+        fields = select_fields(request, POST_FIELDS)
+        return paginate(request, self.get_queryset(**kwargs), fields)
+
+
+class GroupPostListApiView(PostListApiView):
+    def get_queryset(self, slug):
+        group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+        return Post.objects.filter(group=group)
+
+
+class ProfilePostListApiView(PostListApiView):
+    def get_queryset(self, username):
+        author = get_object_or_404(User.objects.only('pk'),
+                                   username=username)
+        return Post.objects.filter(author=author)
+
+
+class FollowPostListApiView(ApiView):
+    """Posts of the authors the user follows, read from the timeline."""
+
+    def get(self, request, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Нужна авторизация'}, status=401)
+        return super().get(request, **kwargs)
+
+    def get_data(self, request):
+        fields = {name: 'post_id' if path == 'pk' else f'post__{path}'
+                  for name, path in select_fields(request,
+                                                  POST_FIELDS).items()}
+        entries = TimelineEntry.objects.filter(user=request.user)
+        return paginate(request, entries, fields, ('created', 'post_id'))
+
+
+class PostApiView(ApiView):
+    """Post with the first page of its comments, the next ones are
+    returned by PostCommentListApiView."""
+
+    def get_data(self, request, post_id):
+        fields = select_fields(request, POST_FIELDS)
+        post = (Post.
+                objects.
+                filter(pk=post_id).
+                values(*fields.values()).
+                first())
+        if post is None:
+            raise Http404
+        data = serialize(post, fields)
+        data['comments'] = paginate(request,
+                                    Comment.objects.filter(post_id=post_id),
+                                    COMMENT_FIELDS)
+        return data
+
+
+class PostCommentListApiView(ApiView):
+    def get_data(self, request, post_id):
+        if not Post.objects.filter(pk=post_id).exists():
+            raise Http404
+        fields = select_fields(request, COMMENT_FIELDS)
+        return paginate(request, Comment.objects.filter(post_id=post_id),
+                        fields)
+
+
+class GroupListApiView(ApiView):
+    """Groups by slug, paginated with ``?after=<last slug>``."""
+
+    def get_data(self, request):
+        fields = select_fields(request, GROUP_FIELDS)
+        groups = Group.objects.order_by('slug')
+        after = request.GET.get('after')
+        if after:
+            groups = groups.filter(slug__gt=after)
+        size = page_size(request)
+        rows: List[Dict] = list(
+            groups.values(*{*fields.values(), 'slug'})[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        return {'results': [serialize(row, fields) for row in rows],
+                'next': rows[-1]['slug'] if has_next else None}
+
+
+class GroupApiView(ApiView):
+    def get_data(self, request, slug):
+        fields = select_fields(request, GROUP_FIELDS)
+        group = (Group.
+                 objects.
+                 filter(slug=slug).
+                 values(*fields.values()).
+                 first())
+        if group is None:
+            raise Http404
+        return serialize(group, fields)
+
+
+class ProfileApiView(ApiView):
+    """User with the counters of their profile."""
+
+    def get_data(self, request, username):
+        fields = select_fields(request, PROFILE_FIELDS)
+        author = (User.
+                  objects.
+                  filter(username=username).
+                  values('pk', *fields.values()).
+                  first())
+        if author is None:
+            raise Http404
+        if any(author[path] is None for path in fields.values()
+               if path.startswith('profile__')):
+            # Профиля ещё нет: он создаётся с актуальными счётчиками
+            profile = get_profile(User(pk=author['pk']))
+            for path in fields.values():
+                if path.startswith('profile__'):
+                    author[path] = getattr(profile, path[len('profile__'):])
+        return serialize(author, fields)
@@ -0,0 +1,30 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    # Ленты постов
+    path('posts/', api.PostListApiView.as_view(), name='posts'),
+    path('follow/', api.FollowPostListApiView.as_view(), name='follow'),
+    path('groups/<slug:slug>/posts/',
+         api.GroupPostListApiView.as_view(),
+         name='group_posts'),
+    path('profiles/<str:username>/posts/',
+         api.ProfilePostListApiView.as_view(),
+         name='profile_posts'),
+
+    # Пост и его комментарии
+    path('posts/<int:post_id>/', api.PostApiView.as_view(), name='post'),
+    path('posts/<int:post_id>/comments/',
+         api.PostCommentListApiView.as_view(),
+         name='post_comments'),
+
+    # Группы и профили
+    path('groups/', api.GroupListApiView.as_view(), name='groups'),
+    path('groups/<slug:slug>/', api.GroupApiView.as_view(), name='group'),
+    path('profiles/<str:username>/',
+         api.ProfileApiView.as_view(),
+         name='profile'),
+]
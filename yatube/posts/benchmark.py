@@ -0,0 +1,276 @@
+import itertools
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from faker import Faker
+
+from core.middleware import QueryCounter
+
+from .importer import Importer
+from .models import Group, Post, Profile
+
+User = get_user_model()
+
+# Пространства имён, маршруты которых замеряются
+BENCHMARK_NAMESPACES = ('posts', 'users', 'about')
+# GET этих маршрутов меняет данные или сессию клиента
+SKIPPED_ROUTES = {'posts:profile_follow', 'posts:profile_unfollow',
+                  'users:logout'}
+# Сколько разных текстов генерировать: Faker медленнее выбора из готовых
+TEXTS_POOL_SIZE = 1000
+
+
+def zipf_weights(size: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..size by Zipf's law:
+    a few items get most of the choices."""
+    return list(itertools.accumulate(1 / rank ** exponent
+                                     for rank in range(1, size + 1)))
+
+
+class DatasetGenerator:
+    """Yields records of a synthetic dataset for posts.importer.
+
+    Post authors, commented posts and followed authors are chosen by
+    Zipf's law, like on a real site where a few authors are popular.
+    The same seed gives the same dataset.
+
+    Parameters
+    ---------------
+    users, groups, posts, comments, follows: Numbers of the records.
+    seed: Seed of the random generators.
+    exponent: Exponent of the Zipf's law.
+    days: Posts are spread over this many days before until.
+    until: Date of the newest post, the current time by default.
+    """
+
+    def __init__(self, users: int, groups: int, posts: int, comments: int,
+                 follows: int, seed: int = 0, exponent: float = 1.1,
+                 days: int = 365, until: Optional[datetime] = None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.exponent = exponent
+        self.days = days
+        self.until = until or timezone.now()
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.first_post_id = (Post.objects.aggregate(last=Max('pk'))['last']
+                              or 0) + 1
+
+    def username(self, number: int) -> str:
+        return f'bench{number}'
+
+    def records(self) -> Iterator[dict]:
+        texts = [self.faker.paragraph(nb_sentences=3)
+                 for _ in range(TEXTS_POOL_SIZE)]
+
+        for number in range(self.groups):
+            yield {'type': 'group', 'slug': f'bench-{number}',
+                   'title': f'{self.faker.catch_phrase()} {number}',
+                   'description': self.faker.sentence()}
+
+        for number in range(self.users):
+            yield {'type': 'user', 'username': self.username(number),
+                   'first_name': self.faker.first_name(),
+                   'last_name': self.faker.last_name()}
+
+        if not self.users:
+            return
+        popular_users = zipf_weights(self.users, self.exponent)
+        user_numbers = range(self.users)
+
+        def popular_user() -> str:
+            return self.username(self.random.choices(
+                user_numbers, cum_weights=popular_users)[0])
+
+        seconds = self.days * 24 * 60 * 60
+        for number in range(self.posts):
+            # Чем больше id, тем новее пост, как при обычной работе
+            created = self.until - timedelta(
+                seconds=seconds * (self.posts - number) / self.posts)
+            record = {'type': 'post',
+                      'id': self.first_post_id + number,
+                      'author': popular_user(),
+                      'text': self.random.choice(texts),
+                      'created': created.isoformat()}
+            if self.groups and self.random.random() < 0.5:
+                record['group'] = (
+                    f'bench-{self.random.randrange(self.groups)}')
+            yield record
+
+        if self.posts:
+            # Обсуждают в основном новые посты
+            popular_posts = zipf_weights(self.posts, self.exponent)
+            post_numbers = range(self.posts - 1, -1, -1)
+            for _ in range(self.comments):
+                number = self.random.choices(
+                    post_numbers, cum_weights=popular_posts)[0]
+                yield {'type': 'comment',
+                       'post': self.first_post_id + number,
+                       'author': popular_user(),
+                       'text': self.random.choice(texts)[:200]}
+
+        for _ in range(self.follows):
+            yield {'type': 'follow',
+                   'user': self.username(self.random.randrange(self.users)),
+                   'author': popular_user()}
+
+    def generate(self, batch_size: int) -> Dict[str, int]:
+        """Writes the dataset, returns {record type: number}."""
+        return Importer(batch_size, rebuild=True).run(self.records())
+
+
+def iter_routes(resolver=None, namespace: str = ''
+                ) -> Iterator[Tuple[str, URLPattern]]:
+    """Yields (view name, pattern) of BENCHMARK_NAMESPACES routes."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            inner = ':'.join(filter(None, (namespace, pattern.namespace)))
+            yield from iter_routes(pattern, inner)
+        elif (pattern.name
+              and namespace.split(':')[0] in BENCHMARK_NAMESPACES):
+            yield f'{namespace}:{pattern.name}', pattern
+
+
+def sample_route_kwargs() -> Dict[str, object]:
+    """Values of the route arguments: the most followed author,
+    the largest group and the most commented post."""
+    kwargs = {}
+    author = (Profile.
+              objects.
+              order_by('-followers_count', 'pk').
+              values_list('user__username', flat=True).
+              first())
+    if author is not None:
+        kwargs['username'] = author
+    group = (Group.
+             objects.
+             annotate(posts_count=Count('posts')).
+             order_by('-posts_count', 'pk').
+             values_list('slug', flat=True).
+             first())
+    if group is not None:
+        kwargs['slug'] = group
+    post_id = (Post.
+               objects.
+               order_by('-comments_count', '-pk').
+               values_list('pk', flat=True).
+               first())
+    if post_id is not None:
+        kwargs['post_id'] = kwargs['pk'] = post_id
+    return kwargs
+
+
+def sample_reader():
+    """The user following the most authors: the heaviest timeline."""
+    profile = (Profile.
+               objects.
+               select_related('user').
+               order_by('-following_count', 'pk').
+               first())
+    if profile is None:
+        return User.objects.order_by('pk').first()
+    return profile.user
+
+
+def timings(durations: List[float]) -> Dict[str, float]:
+    ordered = sorted(durations)
+    return {'min': ordered[0],
+            'median': statistics.median(ordered),
+            'p95': ordered[min(len(ordered) - 1,
+                               int(len(ordered) * 0.95))],
+            'max': ordered[-1]}
+
+
+def measure(client: Client, url: str) -> Tuple[float, int, int]:
+    """Returns (seconds, queries, status) of a GET of the url."""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        response = client.get(url)
+        if hasattr(response, 'streaming_content'):
+            for _ in response.streaming_content:
+                pass
+        duration = time.perf_counter() - start
+    return duration, counter.queries, response.status_code
+
+
+def benchmark_routes(requests: int, host: str = 'localhost',
+                     user=None) -> Dict[str, Dict]:
+    """Times every route of BENCHMARK_NAMESPACES.
+
+    cold is measured with the cache cleared before each request, warm
+    with the cache filled by the previous ones. Routes needing data
+    the database does not have are reported as skipped."""
+    client = Client(HTTP_HOST=host)
+    if user is not None:
+        client.force_login(user)
+    route_kwargs = sample_route_kwargs()
+
+    results: Dict[str, Dict] = {}
+    for name, pattern in iter_routes():
+        if name in SKIPPED_ROUTES:
+            results[name] = {'skipped': 'меняет данные'}
+            continue
+        url = route_url(name, pattern, route_kwargs)
+        if url is None:
+            results[name] = {'skipped': 'нет данных для аргументов'}
+            continue
+
+        cold, warm = [], []
+        queries: Dict[str, int] = {}
+        status: Optional[int] = None
+        try:
+            for _ in range(requests):
+                cache.clear()
+                duration, queries['cold'], status = measure(client, url)
+                cold.append(duration)
+            for _ in range(requests):
+                duration, queries['warm'], status = measure(client, url)
+                warm.append(duration)
+        except Exception as e:
+            # Тестовый клиент пробрасывает исключения представлений
+            results[name] = {'url': url, 'error': repr(e)}
+            continue
+        results[name] = {'url': url,
+                         'status': status,
+                         'queries': queries,
+                         'cold': timings(cold),
+                         'warm': timings(warm)}
+    return results
+
+
+def route_url(name: str, pattern: URLPattern,
+              route_kwargs: Dict[str, object]) -> Optional[str]:
+    arguments = pattern.pattern.converters
+    if not set(arguments) <= set(route_kwargs):
+        return None
+    return reverse(name, kwargs={argument: route_kwargs[argument]
+                                 for argument in arguments})
+
+
+def compare(current: Dict[str, Dict], previous: Dict[str, Dict],
+            timing: str = 'warm') -> List[Tuple[str, float, float]]:
+    """Returns (route, previous median, current median) of the routes
+    measured in both runs."""
+    changes = []
+    for name, result in current.items():
+        before = previous.get(name, {})
+        if timing in result and timing in before:
+            changes.append((name, before[timing]['median'],
+                            result[timing]['median']))
+    return changes
@@ -0,0 +1,130 @@
+from typing import Iterable
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, Profile
+
+User = get_user_model()
+
+
+def _count_subquery(queryset, field: str):
+    """Returns COUNT(*) of queryset rows whose field is the outer pk."""
+    return Coalesce(Subquery(queryset.
+                             filter(**{field: OuterRef('user_id')}).
+                             order_by().
+                             values(field).
+                             annotate(total=Count('pk')).
+                             values('total')),
+                    0)
+
+
+def _comments_subquery():
+    return Coalesce(Subquery(Comment.
+                             objects.
+                             filter(post=OuterRef('pk')).
+                             order_by().
+                             values('post').
+                             annotate(total=Count('pk')).
+                             values('total')),
+                    0)
+
+
+PROFILE_COUNTERS = {
+    'posts_count': lambda: _count_subquery(Post.objects, 'author'),
+    'followers_count': lambda: _count_subquery(Follow.objects, 'author'),
+    'following_count': lambda: _count_subquery(Follow.objects, 'user'),
+}
+
+
+def get_profile(user) -> Profile:
+    """Returns the user profile, creates it with actual counters
+    if the user has none yet."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        pass
+
+    counters = {
+        'posts_count': Post.objects.filter(author=user).count(),
+        'followers_count': Follow.objects.filter(author=user).count(),
+        'following_count': Follow.objects.filter(user=user).count(),
+    }
+    try:
+        with transaction.atomic():
+            return Profile.objects.create(user=user, **counters)
+    except IntegrityError:
+        return Profile.objects.get(user=user)
+
+
+def change_profile_counter(user_id: int, field: str, delta: int):
+    updated = (Profile.
+               objects.
+               filter(user_id=user_id).
+               update(**{field: Greatest(F(field) + delta, 0)}))
+    if not updated and delta > 0:
+        # Новый профиль сразу получит актуальные значения. Профиль не
+        # создаётся при уменьшении: это может быть удаление пользователя
+        get_profile(User.objects.get(pk=user_id))
+
+
+def change_comments_counter(post_id: int, delta: int):
+    (Post.
+     objects.
+     filter(pk=post_id).
+     update(comments_count=Greatest(F('comments_count') + delta, 0)))
+
+
+def reconcile_counters() -> int:
+    """Recomputes all the counters, returns number of repaired rows."""
+    with transaction.atomic():
+        Profile.objects.bulk_create(
+            (Profile(user_id=user_id)
+             for user_id in (User.
+                             objects.
+                             filter(profile__isnull=True).
+                             values_list('pk', flat=True).
+                             iterator())),
+            ignore_conflicts=True)
+
+        actual_profiles = Profile.objects.annotate(
+            **{f'actual_{field}': counter()
+               for field, counter in PROFILE_COUNTERS.items()})
+        drifted_profiles = actual_profiles.exclude(
+            *(Q(**{field: F(f'actual_{field}')})
+              for field in PROFILE_COUNTERS))
+        repaired = drifted_profiles.count()
+        Profile.objects.update(
+            **{field: counter()
+               for field, counter in PROFILE_COUNTERS.items()})
+
+        repaired += (Post.
+                     objects.
+                     annotate(actual_comments=_comments_subquery()).
+                     exclude(comments_count=F('actual_comments')).
+                     count())
+        Post.objects.update(comments_count=_comments_subquery())
+    return repaired
+
+
+def reconcile_profiles(user_ids: Iterable[int]):
+    """Recomputes the counters of the users, creating missing profiles."""
+    user_ids = list(user_ids)
+    Profile.objects.bulk_create(
+        (Profile(user_id=user_id) for user_id in user_ids),
+        ignore_conflicts=True)
+    (Profile.
+     objects.
+     filter(user_id__in=user_ids).
+     update(**{field: counter()
+               for field, counter in PROFILE_COUNTERS.items()}))
+
+
+def reconcile_comments(post_ids: Iterable[int]):
+    """Recomputes the comment counters of the posts."""
+    (Post.
+     objects.
+     filter(pk__in=list(post_ids)).
+     update(comments_count=_comments_subquery()))
@@ -0,0 +1,93 @@
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+EXPORT_CHUNK_SIZE: int = getattr(settings, 'EXPORT_CHUNK_SIZE', 1000)
+
+# Выгружаемые записи в формате команды import_yatube:
+# (тип записи, модель, {ключ записи: поле модели})
+EXPORTED: Tuple[Tuple[str, type, Dict[str, str]], ...] = (
+    ('group', Group, {'slug': 'slug',
+                      'title': 'title',
+                      'description': 'description'}),
+    ('post', Post, {'id': 'pk',
+                    'author': 'author__username',
+                    'group': 'group__slug',
+                    'text': 'text',
+                    'created': 'created',
+                    'image': 'image'}),
+    ('comment', Comment, {'id': 'pk',
+                          'post': 'post_id',
+                          'author': 'author__username',
+                          'text': 'text',
+                          'created': 'created'}),
+    ('follow', Follow, {'user': 'user__username',
+                        'author': 'author__username'}),
+)
+
+
+def iter_rows(queryset, fields: Iterable[str],
+              chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yields values() of all the rows in primary key order.
+
+    Rows are read by keyset chunks: every query starts after the last
+    seen pk, so it costs the same at any depth and only one chunk is
+    held in memory."""
+    fields = ['pk', *(field for field in fields if field != 'pk')]
+    last_pk = 0
+    while True:
+        chunk = list(queryset.
+                     filter(pk__gt=last_pk).
+                     order_by('pk').
+                     values(*fields)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1]['pk']
+
+
+def iter_records(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yields all the groups, posts, comments and follows as records
+    of the import_yatube format."""
+    for record_type, model, keys in EXPORTED:
+        for row in iter_rows(model.objects.all(), keys.values(), chunk_size):
+            record = {'type': record_type}
+            for key, field in keys.items():
+                if row[field] not in (None, ''):
+                    record[key] = row[field]
+            yield record
+
+
+def iter_jsonl(records: Iterable[dict]) -> Iterator[bytes]:
+    for record in records:
+        line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield line.encode() + b'\n'
+
+
+def iter_gzip(chunks: Iterable[bytes],
+              flush_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Compresses the byte chunks into a gzip stream on the fly,
+    yielding output every flush_size bytes of input."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def iter_export(chunk_size: int = EXPORT_CHUNK_SIZE,
+                compress: bool = True) -> Iterator[bytes]:
+    """Yields the whole export as JSONL bytes, gzipped by default."""
+    lines = iter_jsonl(iter_records(chunk_size))
+    return iter_gzip(lines) if compress else lines
@@ -0,0 +1,106 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Кэш лент версионируется поколениями: у каждой ленты (главная,
+# группа, профиль) и у каждого поста есть число, которое меняется
+# при любом изменении. Поколение входит в ключи фрагментов кэша,
+# так что старые фрагменты просто перестают читаться и вытесняются.
+# Поколения работают, только если кэш общий для всех процессов
+# сервера (memcached, redis). Кэш в памяти процесса не видит
+# изменений, замеченных другими процессами: с ним поколения и
+# фрагменты живут FEED_LOCAL_CACHE_TIMEOUT секунд
+FEED_LOCAL_CACHE_TIMEOUT = 20
+FEED_CACHE_IS_LOCAL: bool = (
+    settings.CACHES['default']['BACKEND']
+    == 'django.core.cache.backends.locmem.LocMemCache')
+FEED_CACHE_TIMEOUT = getattr(
+    settings, 'FEED_CACHE_TIMEOUT',
+    FEED_LOCAL_CACHE_TIMEOUT if FEED_CACHE_IS_LOCAL else 60 * 60)
+# None - поколение хранится, пока его не вытеснят
+FEED_GENERATION_TIMEOUT: Optional[int] = (FEED_CACHE_TIMEOUT
+                                          if FEED_CACHE_IS_LOCAL else None)
+
+INDEX_SCOPE = 'index'
+# Общее поколение лент подписок, меняется при их полной перестройке
+TIMELINES_SCOPE = 'timelines'
+
+
+def group_scope(group_id: int) -> str:
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id: int) -> str:
+    return f'profile:{author_id}'
+
+
+def post_scope(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def timeline_scope(user_id: int) -> str:
+    return f'timeline:{user_id}'
+
+
+def _key(scope: str) -> str:
+    return f'feed_generation:{scope}'
+
+
+def _new_generation() -> int:
+    # Время изменения в микросекундах: его же можно отдавать
+    # клиентам как Last-Modified
+    return time.time_ns() // 1000
+
+
+def get_generations(scopes: Iterable[str]) -> Dict[str, int]:
+    """Returns generations of the scopes with one cache request.
+
+    Missing generations are started from the current time."""
+    keys = {_key(scope): scope for scope in scopes}
+    generations = cache.get_many(keys)
+    missing = {key: _new_generation()
+               for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, FEED_GENERATION_TIMEOUT)
+        generations.update(missing)
+    return {keys[key]: generation
+            for key, generation in generations.items()}
+
+
+def get_generation(scope: Optional[str]) -> Optional[int]:
+    if scope is None:
+        return None
+    return get_generations([scope])[scope]
+
+
+def generation_time(generation: int) -> datetime:
+    """Returns the moment of the change that started the generation."""
+    return datetime.fromtimestamp(generation / 10 ** 6, tz=timezone.utc)
+
+
+def get_post_generations(posts: Iterable) -> Dict[int, int]:
+    """Returns {post pk: generation} for the posts."""
+    pks = [post.pk for post in posts]
+    generations = get_generations(post_scope(pk) for pk in pks)
+    return {pk: generations[post_scope(pk)] for pk in pks}
+
+
+def bump_generations(*scopes: str):
+    """Invalidates cached fragments of the scopes."""
+    generation = _new_generation()
+    cache.set_many({_key(scope): generation for scope in scopes},
+                   FEED_GENERATION_TIMEOUT)
+
+
+def bump_post_generations(post, old_group_id: Optional[int] = None):
+    """Invalidates the post and all the feeds that show it."""
+    scopes = [INDEX_SCOPE,
+              profile_scope(post.author_id),
+              post_scope(post.pk)]
+    for group_id in {post.group_id, old_group_id}:
+        if group_id is not None:
+            scopes.append(group_scope(group_id))
+    bump_generations(*scopes)
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .feed_cache import (FEED_CACHE_TIMEOUT, INDEX_SCOPE, group_scope,
+                         profile_scope)
+from .mixins import conditional_response
+from .models import Group, Post
+from .views import feed_validators
+
+User = get_user_model()
+
+SYNDICATION_ITEMS: int = getattr(settings, 'SYNDICATION_ITEMS', 20)
+
+
+class CachedPostsFeed(Feed):
+    """RSS feed of the newest posts, cached per feed generation.
+
+    Validators are the same as of the HTML feed pages, so polling
+    clients get 304 Not Modified after a couple of indexed queries,
+    and a changed feed is rendered once per generation."""
+
+    def get_scope(self, obj) -> str:
+        raise NotImplementedError
+
+    def get_posts(self, obj):
+        """All the posts of the feed, not sliced."""
+        raise NotImplementedError
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        values, last_modified = feed_validators(self.get_posts(obj),
+                                                self.get_scope(obj))
+        # Ссылки в ленте абсолютные: у каждого адреса сайта своя лента
+        values = [type(self).__name__, request.scheme, request.get_host(),
+                  *values]
+
+        def respond(etag):
+            key = f'syndication:{etag}'
+            response = cache.get(key)
+            if response is None:
+                response = super(CachedPostsFeed, self).__call__(
+                    request, *args, **kwargs)
+                cache.set(key, response, FEED_CACHE_TIMEOUT)
+            return response
+
+        return conditional_response(request, values, last_modified, respond)
+
+    def items(self, obj):
+        return self.get_posts(obj).feed()[:SYNDICATION_ITEMS]
+
+    def item_title(self, item):
+        return item.text[:50]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_pubdate(self, item):
+        return item.created
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse('posts:profile',
+                       kwargs={'username': item.author.username})
+
+
+class IndexFeed(CachedPostsFeed):
+    title = 'Yatube: последние обновления на сайте'
+    description = 'Новые посты всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_scope(self, obj):
+        return INDEX_SCOPE
+
+    def get_posts(self, obj):
+        return Post.objects.all()
+
+
+class GroupFeed(CachedPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group.objects.only('title', 'description',
+                                                    'slug'),
+                                 slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def get_scope(self, obj):
+        return group_scope(obj.pk)
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorFeed(CachedPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: посты {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return self.title(obj)
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def get_scope(self, obj):
+        return profile_scope(obj.pk)
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = Atom1Feed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.title(obj)
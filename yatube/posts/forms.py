@@ -1,8 +1,26 @@
 from django import forms
-from .models import Post, Comment
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
+from .images import make_master_image
+from .models import Post, Comment, Group
+
+User = get_user_model()
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, отвергнутые при загрузке, см. posts.uploads
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image = make_master_image(image)
+        return image
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -12,3 +30,26 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Найти', max_length=200)
+    group = forms.ModelChoiceField(Group.objects.all(),
+                                   label='Группа',
+                                   to_field_name='slug',
+                                   required=False)
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_author(self):
+        """Returns the author id, None if the author is not given."""
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        author_id = (User.
+                     objects.
+                     filter(username=username).
+                     values_list('pk', flat=True).
+                     first())
+        if author_id is None:
+            raise forms.ValidationError('Нет такого автора')
+        return author_id
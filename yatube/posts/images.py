@@ -0,0 +1,127 @@
+import base64
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Сторона превью-заглушки, которую страница показывает,
+# пока грузится сама картинка
+PLACEHOLDER_SIZE: int = getattr(settings, 'POST_IMAGE_PLACEHOLDER_SIZE', 16)
+
+# Ограничения загружаемых картинок и размер хранимого оригинала
+MAX_IMAGE_BYTES: int = getattr(settings, 'POST_IMAGE_MAX_BYTES',
+                               20 * 1024 * 1024)
+MAX_IMAGE_PIXELS: int = getattr(settings, 'POST_IMAGE_MAX_PIXELS',
+                                50 * 1000 * 1000)
+MASTER_IMAGE_SIDE: int = getattr(settings, 'POST_IMAGE_MASTER_SIDE', 2048)
+
+# Форматы, в которых оригинал сохраняется как есть, остальные
+# перекодируются в JPEG
+MASTER_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif',
+                  'WEBP': '.webp'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+# Ошибки чтения картинки: её нет в хранилище или она повреждена
+IMAGE_ERRORS = (OSError, ValueError, SuspiciousFileOperation)
+
+
+def too_large_message() -> str:
+    return f'Файл больше {filesizeformat(MAX_IMAGE_BYTES)}'
+
+
+def too_many_pixels_message() -> str:
+    return f'Картинка больше {MAX_IMAGE_PIXELS // 10 ** 6} Мпикс'
+
+
+def broken_image_message() -> str:
+    return 'Файл повреждён или это не картинка'
+
+
+def make_master_image(upload: UploadedFile) -> UploadedFile:
+    """Returns the upload reduced to MASTER_IMAGE_SIDE pixels, turned
+    by its EXIF orientation and saved without EXIF.
+
+    JPEG is decoded right at a reduced scale in draft mode, so the
+    full resolution bitmap is never allocated.
+    Raises ValidationError if the upload exceeds the limits or can
+    not be decoded."""
+    if upload.size > MAX_IMAGE_BYTES:
+        raise ValidationError(too_large_message())
+
+    try:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            if image.width * image.height > MAX_IMAGE_PIXELS:
+                raise ValidationError(too_many_pixels_message())
+            image_format = image.format
+            if image_format in ('JPEG', 'MPO'):
+                image.draft('RGB', (MASTER_IMAGE_SIDE, MASTER_IMAGE_SIDE))
+            image.load()
+            image = ImageOps.exif_transpose(image)
+
+        image.thumbnail((MASTER_IMAGE_SIDE, MASTER_IMAGE_SIDE),
+                        Image.LANCZOS)
+        name, extension = os.path.splitext(upload.name)
+        if image_format not in MASTER_FORMATS:
+            image_format = 'JPEG'
+            extension = MASTER_FORMATS[image_format]
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format,
+                   **SAVE_OPTIONS.get(image_format, {}))
+    except (*IMAGE_ERRORS, Image.DecompressionBombError):
+        # Заголовок проходит проверку ImageField, а данные обрезаны
+        raise ValidationError(broken_image_message())
+    return SimpleUploadedFile(f'{name}{extension}',
+                              buffer.getvalue(),
+                              content_type=Image.MIME[image_format])
+
+
+def make_placeholder(image: Image.Image) -> str:
+    """Returns a tiny blurred copy of the image as a data URI,
+    small enough to be inlined in the page."""
+    preview = image.convert('RGB')
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    preview.save(buffer, format='JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def clear_image_metadata(post):
+    post.image_width = post.image_height = post.image_size = None
+    post.image_placeholder = ''
+
+
+def fill_image_metadata(post):
+    """Stores dimensions, byte size and placeholder of the post image
+    in the post fields, so pages never open the file to lay it out.
+
+    Works both for a just uploaded file and a stored one.
+    Raises one of IMAGE_ERRORS if the file can not be read."""
+    if not post.image:
+        clear_image_metadata(post)
+        return
+
+    file = post.image
+    file.open('rb')
+    try:
+        post.image_size = file.size
+        with Image.open(file) as image:
+            post.image_width, post.image_height = image.size
+            post.image_placeholder = make_placeholder(image)
+    finally:
+        if file._committed:
+            file.close()
+        else:
+            # Загруженный файл ещё будет сохранён в хранилище целиком
+            file.seek(0)
@@ -0,0 +1,325 @@
+import csv
+import gzip
+import json
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import (reconcile_comments, reconcile_counters,
+                       reconcile_profiles)
+from .feed_cache import (INDEX_SCOPE, bump_generations, group_scope,
+                         profile_scope)
+from .models import Comment, Follow, Group, Post
+from .search import drop_search_triggers, install_search
+from .timelines import rebuild_timelines, refresh_timelines
+
+User = get_user_model()
+
+IMPORT_BATCH_SIZE: int = getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+
+# Типы записей в порядке записи в базу: посты ссылаются на группы
+# и пользователей, комментарии на посты, подписки на пользователей
+RECORD_TYPES = ('group', 'user', 'post', 'comment', 'follow')
+# Обязательные поля записей каждого типа
+REQUIRED_KEYS = {
+    'group': ('slug',),
+    'user': ('username',),
+    'post': ('author', 'text'),
+    'comment': ('post', 'author', 'text'),
+    'follow': ('user', 'author'),
+}
+# Поля с id, которые должны быть целыми числами
+ID_KEYS = ('id', 'post')
+
+
+class ImportDataError(ValueError):
+    """Raised for a record that can not be imported."""
+
+
+def open_source(path: str):
+    """Opens the file to import as text, - is the standard input."""
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def check_record(record: dict, line_number: int):
+    """Raises ImportDataError if the record can not be written."""
+    if record.get('type') not in RECORD_TYPES:
+        raise ImportDataError(
+            f'Строка {line_number}: неизвестный тип записи')
+    for key in REQUIRED_KEYS[record['type']]:
+        if key not in record:
+            raise ImportDataError(f'Строка {line_number}: нет поля {key}')
+    for key in ID_KEYS:
+        if key in record and not str(record[key]).isdigit():
+            raise ImportDataError(
+                f'Строка {line_number}: {key} должен быть числом')
+
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[dict]:
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ImportDataError(f'Строка {line_number}: {e}')
+        if not isinstance(record, dict):
+            raise ImportDataError(f'Строка {line_number}: это не объект')
+        check_record(record, line_number)
+        yield record
+
+
+def read_csv(lines: Iterable[str], record_type: str) -> Iterator[dict]:
+    """Reads records of one type, columns are named as record keys."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Пустые ячейки CSV - это отсутствующие значения
+        record = {key: value for key, value in row.items() if value != ''}
+        record['type'] = record_type
+        check_record(record, reader.line_num)
+        yield record
+
+
+@contextmanager
+def explicit_created_dates():
+    """Lets bulk_create keep the imported creation dates:
+    auto_now_add would replace them with the current time."""
+    fields = [model._meta.get_field('created') for model in (Post, Comment)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Bulk loader of groups, users, posts, comments and follows.
+
+    Records are buffered per type and written with bulk_create, each
+    batch in its own transaction, so memory use does not grow with the
+    input. Writing a batch first writes the pending batches of the types
+    it refers to. Usernames and group slugs are resolved to ids through
+    in-memory maps.
+
+    bulk_create sends no signals: counters, timelines and the feed
+    cache are brought up to date by finish() for the affected users
+    only, comment counters after each batch. With rebuild the search
+    index triggers are dropped for the load, and finish() rebuilds the
+    index, all the counters and timelines: faster for an initial load.
+
+    Parameters
+    ---------------
+    batch_size: Number of records of one type written at once.
+    rebuild: Rebuild everything after the load instead of updating
+        the affected rows.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE,
+                 rebuild: bool = False):
+        self.batch_size = batch_size
+        self.rebuild = rebuild
+        self.buffers: Dict[str, List[dict]] = {
+            record_type: [] for record_type in RECORD_TYPES}
+        self.imported: Dict[str, int] = dict.fromkeys(RECORD_TYPES, 0)
+        self.user_ids: Dict[str, int] = {}
+        self.group_ids: Dict[str, int] = {}
+        # Что показывают закэшированные страницы, см. finish
+        self.touched_groups: Set[int] = set()
+        self.touched_authors: Set[int] = set()
+        # Чьи счётчики и ленты подписок изменились
+        self.touched_users: Set[int] = set()
+        self.touched_followers: Set[int] = set()
+
+    def run(self, records: Iterable[dict]) -> Dict[str, int]:
+        """Imports the records, returns {type: number of records}."""
+        if self.rebuild:
+            drop_search_triggers()
+        try:
+            with explicit_created_dates():
+                for record in records:
+                    self.add(record)
+                self.flush()
+        finally:
+            self.finish()
+        return self.imported
+
+    def add(self, record: dict):
+        record_type = record['type']
+        buffer = self.buffers[record_type]
+        buffer.append(record)
+        if len(buffer) >= self.batch_size:
+            self.flush(record_type)
+
+    def flush(self, up_to: str = RECORD_TYPES[-1]):
+        """Writes the buffered records of the type and of all the
+        types before it."""
+        for record_type in RECORD_TYPES[:RECORD_TYPES.index(up_to) + 1]:
+            buffer = self.buffers[record_type]
+            if not buffer:
+                continue
+            with transaction.atomic():
+                getattr(self, f'write_{record_type}s')(buffer)
+            self.imported[record_type] += len(buffer)
+            buffer.clear()
+
+    def finish(self):
+        with connection.cursor() as cursor:
+            # Посты и комментарии могли прийти с явными id
+            for statement in connection.ops.sequence_reset_sql(
+                    no_style(), [Post, Comment]):
+                cursor.execute(statement)
+        if self.rebuild:
+            install_search(rebuild=True)
+            reconcile_counters()
+            with transaction.atomic():
+                rebuild_timelines()
+        else:
+            for user_ids in self.chunks(self.touched_users):
+                reconcile_profiles(user_ids)
+            for user_ids in self.chunks(self.touched_followers):
+                with transaction.atomic():
+                    refresh_timelines(user_ids=user_ids)
+            for author_ids in self.chunks(self.touched_authors):
+                with transaction.atomic():
+                    refresh_timelines(author_ids=author_ids)
+        # Поколения постов не трогаются: новые посты ещё не в кэше,
+        # а валидаторы страницы поста и так учитывают комментарии
+        bump_generations(INDEX_SCOPE,
+                         *map(group_scope, self.touched_groups),
+                         *map(profile_scope, self.touched_authors))
+
+    def chunks(self, ids: Set[int]) -> Iterator[List[int]]:
+        ids = sorted(ids)
+        for start in range(0, len(ids), self.batch_size):
+            yield ids[start:start + self.batch_size]
+
+    def resolve_users(self, usernames: Iterable[str]) -> Dict[str, int]:
+        """Returns {username: id}, unknown users are created
+        without a usable password."""
+        usernames = set(usernames)
+        missing = usernames - self.user_ids.keys()
+        if missing:
+            self.user_ids.update(User.
+                                 objects.
+                                 filter(username__in=missing).
+                                 values_list('username', 'pk'))
+            missing -= self.user_ids.keys()
+        if missing:
+            User.objects.bulk_create(
+                (User(username=username, password=make_password(None))
+                 for username in missing),
+                ignore_conflicts=True)
+            self.user_ids.update(User.
+                                 objects.
+                                 filter(username__in=missing).
+                                 values_list('username', 'pk'))
+        return self.user_ids
+
+    def resolve_group(self, slug: Optional[str]) -> Optional[int]:
+        if not slug:
+            return None
+        if slug not in self.group_ids:
+            group_id = (Group.
+                        objects.
+                        filter(slug=slug).
+                        values_list('pk', flat=True).
+                        first())
+            if group_id is None:
+                raise ImportDataError(f'Нет группы {slug}')
+            self.group_ids[slug] = group_id
+        return self.group_ids[slug]
+
+    def created(self, record: dict):
+        if 'created' not in record:
+            return timezone.now()
+        created = parse_datetime(record['created'])
+        if created is None:
+            raise ImportDataError(f'Неверная дата {record["created"]}')
+        if timezone.is_naive(created):
+            created = timezone.make_aware(created)
+        return created
+
+    def write_groups(self, records: List[dict]):
+        Group.objects.bulk_create(
+            (Group(title=record.get('title', record['slug']),
+                   slug=record['slug'],
+                   description=record.get('description', ''))
+             for record in records),
+            ignore_conflicts=True)
+
+    def write_users(self, records: List[dict]):
+        User.objects.bulk_create(
+            (User(username=record['username'],
+                  first_name=record.get('first_name', ''),
+                  last_name=record.get('last_name', ''),
+                  email=record.get('email', ''),
+                  password=make_password(None))
+             for record in records),
+            ignore_conflicts=True)
+
+    def write_posts(self, records: List[dict]):
+        user_ids = self.resolve_users(record['author'] for record in records)
+        posts = []
+        for record in records:
+            post = Post(id=record.get('id'),
+                        text=record['text'],
+                        author_id=user_ids[record['author']],
+                        group_id=self.resolve_group(record.get('group')),
+                        image=record.get('image', ''),
+                        created=self.created(record))
+            self.touched_authors.add(post.author_id)
+            self.touched_users.add(post.author_id)
+            if post.group_id is not None:
+                self.touched_groups.add(post.group_id)
+            posts.append(post)
+        # Посты с уже занятыми id пропускаются: импорт можно повторить
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+
+    def write_comments(self, records: List[dict]):
+        user_ids = self.resolve_users(record['author'] for record in records)
+        post_ids = {int(record['post']) for record in records}
+        existing = set(Post.
+                       objects.
+                       filter(pk__in=post_ids).
+                       values_list('pk', flat=True))
+        missing = post_ids - existing
+        if missing:
+            raise ImportDataError(f'Нет постов {sorted(missing)}')
+        Comment.objects.bulk_create(
+            (Comment(id=record.get('id'),
+                     post_id=int(record['post']),
+                     author_id=user_ids[record['author']],
+                     text=record['text'],
+                     created=self.created(record))
+             for record in records),
+            ignore_conflicts=True)
+        if not self.rebuild:
+            reconcile_comments(post_ids)
+
+    def write_follows(self, records: List[dict]):
+        user_ids = self.resolve_users(
+            username
+            for record in records
+            for username in (record['user'], record['author']))
+        follows = [Follow(user_id=user_ids[record['user']],
+                          author_id=user_ids[record['author']])
+                   for record in records
+                   if record['user'] != record['author']]
+        for follow in follows:
+            self.touched_followers.add(follow.user_id)
+            self.touched_users.update((follow.user_id, follow.author_id))
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
@@ -0,0 +1,317 @@
+import http.client
+import random
+import socketserver
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model)
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+from .benchmark import zipf_weights
+from .models import Group, Post, Profile
+
+User = get_user_model()
+
+# Смесь маршрутов по умолчанию: маршрут - доля запросов
+LOAD_MIX: Dict[str, int] = {
+    'posts:index': 30,
+    'posts:post_detail': 25,
+    'posts:follow_index': 15,
+    'posts:profile': 10,
+    'posts:group_list': 5,
+    'posts:profile_follow': 5,
+    'posts:profile_unfollow': 5,
+    'posts:add_comment': 5,
+}
+# Маршруты только для вошедших пользователей
+LOGIN_ROUTES = {'posts:follow_index', 'posts:profile_follow',
+                'posts:profile_unfollow', 'posts:add_comment'}
+# Ответы действий - перенаправления. Страницы ошибок CSRF и 500
+# отдаются с кодом 200, поэтому он для действий тоже ошибка
+EXPECTED_STATUS = {'posts:profile_follow': {302},
+                   'posts:profile_unfollow': {302},
+                   'posts:add_comment': {302}}
+# Сколько новых постов, авторов и пользователей берётся в выборки
+LOAD_SAMPLE_SIZE = 1000
+PERCENTILES = (50, 95, 99)
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = '127.0.0.1', port: int = 0) -> WSGIServer:
+    """Starts yatube.wsgi in a background thread of this process and
+    serves each request in a thread of its own. Port 0 picks a free
+    one."""
+    from yatube.wsgi import application
+
+    server = make_server(host, port, application,
+                         server_class=ThreadingWSGIServer,
+                         handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(ordered: Sequence[float], rank: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, int(len(ordered) * rank / 100 + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def login_session(user) -> Dict[str, str]:
+    """Cookies of a new logged in session of the user with a CSRF
+    token, without going through the login form."""
+    session = SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    request = HttpRequest()
+    token = get_token(request)
+    return {settings.SESSION_COOKIE_NAME: session.session_key,
+            settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+            'csrfmiddlewaretoken': token}
+
+
+class LoadSample:
+    """Arguments of the routes: new posts, popular authors and groups,
+    chosen by Zipf's law like in posts.benchmark.
+
+    Parameters
+    ---------------
+    sessions: Number of users to log in, the ones following most.
+    """
+
+    def __init__(self, sessions: int):
+        self.post_ids = list(Post.
+                             objects.
+                             order_by('-pk').
+                             values_list('pk', flat=True)
+                             [:LOAD_SAMPLE_SIZE])
+        self.authors = list(Profile.
+                            objects.
+                            order_by('-followers_count', 'pk').
+                            values_list('user__username', flat=True)
+                            [:LOAD_SAMPLE_SIZE])
+        self.post_weights = zipf_weights(len(self.post_ids), 1.1)
+        self.author_weights = zipf_weights(len(self.authors), 1.1)
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        readers = (User.
+                   objects.
+                   order_by('-profile__following_count', 'pk')
+                   [:sessions])
+        self.sessions = [login_session(user) for user in readers]
+
+    def route_kwargs(self, name: str, chance: random.Random
+                     ) -> Optional[Dict[str, object]]:
+        """Returns the arguments of the route, None if there is no
+        data for them."""
+        if name in ('posts:post_detail', 'posts:add_comment'):
+            if not self.post_ids:
+                return None
+            return {'post_id': chance.choices(
+                self.post_ids, cum_weights=self.post_weights)[0]}
+        if name in ('posts:profile', 'posts:profile_follow',
+                    'posts:profile_unfollow'):
+            if not self.authors:
+                return None
+            return {'username': chance.choices(
+                self.authors, cum_weights=self.author_weights)[0]}
+        if name == 'posts:group_list':
+            if not self.groups:
+                return None
+            return {'slug': chance.choice(self.groups)}
+        return {}
+
+
+class LoadWorker(threading.Thread):
+    """Thread sending requests of the mix until the deadline or until
+    the shared request budget is spent.
+
+    Parameters
+    ---------------
+    driver: LoadDriver the worker belongs to.
+    number: Number of the worker, seeds its random generator.
+    """
+
+    def __init__(self, driver: 'LoadDriver', number: int):
+        super().__init__(daemon=True)
+        self.driver = driver
+        self.random = random.Random(driver.seed * 1000 + number)
+        self.results: List[Tuple[str, float, Optional[int]]] = []
+        self.skipped: Counter = Counter()
+
+    def run(self):
+        driver = self.driver
+        routes = list(driver.mix)
+        weights = list(driver.mix.values())
+        while driver.take():
+            name = self.random.choices(routes, weights)[0]
+            result = self.request(name)
+            if result is None:
+                self.skipped[name] += 1
+            else:
+                self.results.append(result)
+
+    def request(self, name: str
+                ) -> Optional[Tuple[str, float, Optional[int]]]:
+        """Returns (route, seconds, status), status None on a
+        connection error. None if there is no data for the route."""
+        driver = self.driver
+        kwargs = driver.sample.route_kwargs(name, self.random)
+        session = None
+        if driver.sample.sessions and (
+                name in LOGIN_ROUTES
+                or self.random.random() < driver.logged_in):
+            session = self.random.choice(driver.sample.sessions)
+        if kwargs is None or (name in LOGIN_ROUTES and session is None):
+            return None
+
+        headers = {'Host': driver.host}
+        body = None
+        method = 'GET'
+        if session is not None:
+            headers['Cookie'] = '; '.join(
+                f'{key}={value}' for key, value in session.items()
+                if key != 'csrfmiddlewaretoken')
+        if name == 'posts:add_comment':
+            method = 'POST'
+            body = urlencode({
+                'text': f'Нагрузка {self.random.randrange(10 ** 6)}',
+                'csrfmiddlewaretoken': session['csrfmiddlewaretoken']})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        connection = http.client.HTTPConnection(*driver.address,
+                                                timeout=driver.timeout)
+        start = time.perf_counter()
+        try:
+            connection.request(method, reverse(name, kwargs=kwargs), body,
+                               headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = None
+        finally:
+            connection.close()
+        return name, time.perf_counter() - start, status
+
+
+class LoadDriver:
+    """Replays a weighted mix of routes with concurrent threads
+    against a running server and reports latency per route.
+
+    Parameters
+    ---------------
+    address: (host, port) of the server.
+    sample: LoadSample with the route arguments and sessions.
+    mix: {route: weight}, LOAD_MIX by default.
+    threads: Number of concurrent clients.
+    duration: Seconds to run, None - until requests are sent.
+    requests: Total number of requests, None - until duration ends.
+    logged_in: Share of public page requests sent logged in.
+    timeout: Socket timeout of a request, seconds.
+    seed: Seed of the random generators of the workers.
+    """
+
+    def __init__(self, address: Tuple[str, int], sample: LoadSample,
+                 mix: Optional[Dict[str, int]] = None, threads: int = 8,
+                 duration: Optional[float] = 10,
+                 requests: Optional[int] = None, logged_in: float = 0.3,
+                 timeout: float = 30, seed: int = 0):
+        if duration is None and requests is None:
+            raise ValueError('Нужно ограничить время или число запросов')
+        self.address = address
+        self.host = '{}:{}'.format(*address)
+        self.sample = sample
+        self.mix = {name: weight for name, weight in (mix or LOAD_MIX).items()
+                    if weight > 0}
+        self.threads = threads
+        self.duration = duration
+        self.remaining = requests
+        self.logged_in = logged_in
+        self.timeout = timeout
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.deadline: Optional[float] = None
+
+    def take(self) -> bool:
+        """Reserves one request of the budget, False when done."""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        if self.remaining is None:
+            return True
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def run(self) -> Dict[str, Dict]:
+        """Returns the report, see report."""
+        workers = [LoadWorker(self, number) for number in range(self.threads)]
+        start = time.monotonic()
+        if self.duration is not None:
+            self.deadline = start + self.duration
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - start
+        return report([result for worker in workers
+                       for result in worker.results],
+                      sum((worker.skipped for worker in workers), Counter()),
+                      elapsed)
+
+
+def report(results: List[Tuple[str, float, Optional[int]]],
+           skipped: Counter, elapsed: float) -> Dict[str, Dict]:
+    """Returns {route: statistics} and the 'total' of all routes:
+    requests, skipped, errors, error_rate, rps and the latency
+    percentiles in milliseconds."""
+    by_route = defaultdict(list)
+    for name, duration, status in results:
+        ok = succeeded(name, status)
+        by_route[name].append((duration, ok))
+        by_route['total'].append((duration, ok))
+    for name in skipped:
+        by_route.setdefault(name, [])
+
+    statistics = {}
+    for name, measured in sorted(by_route.items()):
+        errors = sum(1 for _, ok in measured if not ok)
+        durations = sorted(duration for duration, _ in measured)
+        route = {'requests': len(measured),
+                 'skipped': (sum(skipped.values()) if name == 'total'
+                             else skipped[name]),
+                 'errors': errors,
+                 'error_rate': errors / len(measured) if measured else 0.0,
+                 'rps': len(measured) / elapsed if elapsed else 0.0}
+        for rank in PERCENTILES:
+            route[f'p{rank}'] = (percentile(durations, rank) * 1000
+                                 if durations else None)
+        statistics[name] = route
+    return statistics
+
+
+def succeeded(name: str, status: Optional[int]) -> bool:
+    if status is None:
+        return False
+    if name in EXPECTED_STATUS:
+        return status in EXPECTED_STATUS[name]
+    return status < 400
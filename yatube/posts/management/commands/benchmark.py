@@ -0,0 +1,89 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import (DatasetGenerator, benchmark_routes, compare,
+                             sample_reader)
+from posts.importer import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа всех страниц posts, users и about '
+            'с холодным и тёплым кэшем, может сначала создать '
+            'синтетические данные. Пример большого набора: --generate '
+            '--users=100000 --posts=5000000 --comments=20000000 '
+            '--follows=2000000')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', action='store_true',
+                            help='Сначала создать синтетические данные')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--requests', type=int, default=5,
+                            help='Запросов к странице на каждый замер')
+        parser.add_argument('--host', default='localhost',
+                            help='Заголовок Host запросов')
+        parser.add_argument('--output', default='benchmark.json',
+                            help='Файл результатов JSON')
+        parser.add_argument('--compare',
+                            help='Файл результатов прошлого замера')
+
+    def handle(self, *args, **options):
+        dataset = None
+        if options['generate']:
+            generator = DatasetGenerator(options['users'], options['groups'],
+                                         options['posts'],
+                                         options['comments'],
+                                         options['follows'],
+                                         seed=options['seed'])
+            dataset = generator.generate(options['batch_size'])
+            self.stdout.write(f'Создано: {dataset}')
+
+        reader = sample_reader()
+        routes = benchmark_routes(options['requests'], options['host'],
+                                  reader)
+        results = {'commit': self.commit(),
+                   'dataset': dataset,
+                   'reader': reader.username if reader else None,
+                   'requests': options['requests'],
+                   'routes': routes}
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+
+        for name, result in routes.items():
+            if 'skipped' in result:
+                self.stdout.write(f'{name}: пропущен, {result["skipped"]}')
+                continue
+            if 'error' in result:
+                self.stdout.write(f'{name}: ошибка {result["error"]}')
+                continue
+            self.stdout.write(
+                f'{name}: {result["status"]}, '
+                f'холодный {result["cold"]["median"] * 1000:.1f} мс, '
+                f'тёплый {result["warm"]["median"] * 1000:.1f} мс, '
+                f'запросов {result["queries"]["cold"]}/'
+                f'{result["queries"]["warm"]}')
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                previous_routes = json.load(previous)['routes']
+            for name, before, after in compare(routes, previous_routes):
+                self.stdout.write(f'{name}: {before * 1000:.1f} -> '
+                                  f'{after * 1000:.1f} мс '
+                                  f'({after / before:.2f}x)')
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                  capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
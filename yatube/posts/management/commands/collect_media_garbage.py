@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+
+POST_IMAGES_DIRECTORY = 'posts'
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help=('Не трогать файлы моложе этого: их пост '
+                                  'может быть ещё не сохранён'))
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        referenced = set(Post.
+                         objects.
+                         exclude(image='').
+                         values_list('image', flat=True).
+                         iterator())
+        grace = timedelta(hours=options['grace_hours'])
+        now = timezone.now()
+
+        deleted = 0
+        for name in storage.walk(POST_IMAGES_DIRECTORY):
+            if name in referenced:
+                continue
+            if now - storage.get_modified_time(name) < grace:
+                continue
+            # Пост с этой картинкой мог появиться после выборки выше
+            if Post.objects.filter(image=name).exists():
+                continue
+            deleted += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                delete_with_thumbnails(ImageFile(name, storage))
+        self.stdout.write(f'Файлов без постов: {deleted}')
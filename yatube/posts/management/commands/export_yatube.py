@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.exporter import EXPORT_CHUNK_SIZE, iter_export
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL, '
+            'сжатый gzip, в формате import_yatube')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--no-compress', action='store_true',
+                            help='Не сжимать выгрузку')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options['chunk_size'],
+                             compress=not options['no_compress'])
+        if options['path'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+        else:
+            with open(options['path'], 'wb') as output:
+                self.write(chunks, output)
+
+    @staticmethod
+    def write(chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed_cache import bump_post_generations
+from posts.images import IMAGE_ERRORS, fill_image_metadata
+from posts.models import Post
+
+METADATA_FIELDS = ['image_width', 'image_height', 'image_size',
+                   'image_placeholder']
+
+
+class Command(BaseCommand):
+    help = ('Заполняет размеры и заглушки картинок постов, '
+            'загруженных до их появления')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересчитать и уже заполненные картинки')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = (Post.
+                 objects.
+                 exclude(image='').
+                 only('image', 'author_id', 'group_id', *METADATA_FIELDS).
+                 order_by('pk'))
+        if not options['all']:
+            posts = posts.filter(image_width__isnull=True)
+
+        filled, failed, batch = 0, 0, []
+        for post in posts.iterator(chunk_size=options['batch_size']):
+            try:
+                fill_image_metadata(post)
+            except IMAGE_ERRORS as e:
+                failed += 1
+                self.stderr.write(f'Пост {post.pk}: {e}')
+                continue
+            batch.append(post)
+            if len(batch) >= options['batch_size']:
+                filled += self.save(batch)
+        filled += self.save(batch)
+        self.stdout.write(f'Заполнено картинок: {filled}, ошибок: {failed}')
+
+    def save(self, batch) -> int:
+        # Сигналы не нужны: меняются только поля картинки
+        Post.objects.bulk_update(batch, METADATA_FIELDS)
+        for post in batch:
+            bump_post_generations(post)
+        saved = len(batch)
+        batch.clear()
+        return saved
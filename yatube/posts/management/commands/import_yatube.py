@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (IMPORT_BATCH_SIZE, RECORD_TYPES, ImportDataError,
+                            Importer, open_source, read_csv, read_jsonl)
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, пользователей, посты, комментарии '
+            'и подписки из JSONL или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path',
+                            help='Файл (можно .gz) или - для stdin')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            default='jsonl')
+        parser.add_argument('--type', choices=RECORD_TYPES,
+                            help='Тип записей CSV-файла')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--rebuild', action='store_true',
+                            help=('Перестроить поиск, все счётчики и '
+                                  'ленты подписок, а не только '
+                                  'затронутые: быстрее для первой загрузки'))
+
+    def handle(self, *args, **options):
+        if options['format'] == 'csv' and not options['type']:
+            raise CommandError('Для CSV нужен --type')
+
+        source = open_source(options['path'])
+        try:
+            if options['format'] == 'csv':
+                records = read_csv(source, options['type'])
+            else:
+                records = read_jsonl(source)
+            imported = Importer(options['batch_size'],
+                                options['rebuild']).run(records)
+        except ImportDataError as e:
+            raise CommandError(e)
+        finally:
+            if options['path'] != '-':
+                source.close()
+
+        for record_type, count in imported.items():
+            self.stdout.write(f'{record_type}: {count}')
@@ -0,0 +1,113 @@
+import json
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import DatasetGenerator
+from posts.importer import IMPORT_BATCH_SIZE
+from posts.load_test import LOAD_MIX, LoadDriver, LoadSample, serve
+
+
+def route_weight(value: str):
+    name, _, weight = value.rpartition('=')
+    if not name or not weight.isdigit():
+        raise ValueError(value)
+    return name, int(weight)
+
+
+def server_address(value: str):
+    url = urlsplit(value)
+    if url.scheme != 'http' or not url.hostname:
+        raise ValueError(value)
+    return url.hostname, url.port or 80
+
+
+class Command(BaseCommand):
+    help = ('Запускает yatube.wsgi в этом процессе и нагружает его '
+            'смесью запросов из нескольких потоков, включая подписки и '
+            'комментарии вошедших пользователей. Выводит p50/p95/p99, '
+            'запросы в секунду и долю ошибок каждого маршрута. '
+            'Потоки нагрузки делят GIL с сервером в том же процессе, '
+            'и задержки получаются завышенными: для точных измерений '
+            'запустите сервер отдельно и передайте его адрес в --url')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Число одновременных клиентов')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность нагрузки, секунды')
+        parser.add_argument('--requests', type=int,
+                            help='Остановиться после стольких запросов')
+        parser.add_argument('--sessions', type=int, default=20,
+                            help='Сколько пользователей войдут на сайт')
+        parser.add_argument('--logged-in', type=float, default=0.3,
+                            help='Доля запросов публичных страниц '
+                                 'от вошедших пользователей')
+        parser.add_argument('--mix', type=route_weight, action='append',
+                            default=[], metavar='ROUTE=WEIGHT',
+                            help='Доля маршрута, например '
+                                 'posts:index=50; 0 исключает маршрут')
+        parser.add_argument('--bind', default='127.0.0.1:0',
+                            help='Адрес сервера, порт 0 - любой свободный')
+        parser.add_argument('--url', type=server_address,
+                            help='Нагружать уже запущенный сервер, '
+                                 'например http://127.0.0.1:8000. '
+                                 'Он должен работать с той же базой')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--generate', action='store_true',
+                            help='Сначала создать синтетические данные '
+                                 'командой benchmark по умолчанию')
+        parser.add_argument('--output', help='Файл результатов JSON')
+
+    def handle(self, *args, **options):
+        mix = dict(LOAD_MIX)
+        for name, weight in options['mix']:
+            if name not in LOAD_MIX:
+                raise CommandError(f'Неизвестный маршрут {name}, есть: '
+                                   f'{", ".join(LOAD_MIX)}')
+            mix[name] = weight
+        host, _, port = options['bind'].rpartition(':')
+        address = options['url']
+
+        if options['generate']:
+            dataset = DatasetGenerator(users=1000, groups=20, posts=10000,
+                                       comments=20000, follows=10000,
+                                       seed=options['seed']).generate(
+                IMPORT_BATCH_SIZE)
+            self.stdout.write(f'Создано: {dataset}')
+
+        sample = LoadSample(options['sessions'])
+        server = None
+        if address is None:
+            server = serve(host or '127.0.0.1', int(port or 0))
+            address = server.server_address[:2]
+        try:
+            driver = LoadDriver(address, sample, mix,
+                                threads=options['threads'],
+                                duration=options['duration'],
+                                requests=options['requests'],
+                                logged_in=options['logged_in'],
+                                seed=options['seed'])
+            self.stdout.write(f'Нагрузка на http://{driver.host}/ '
+                              f'из {options["threads"]} потоков')
+            routes = driver.run()
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        if options['output']:
+            results = {'threads': options['threads'], 'mix': mix,
+                       'routes': routes}
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+
+        for name, route in routes.items():
+            if not route['requests']:
+                self.stdout.write(f'{name}: нет данных для аргументов')
+                continue
+            self.stdout.write(
+                f'{name}: {route["requests"]} запросов, '
+                f'{route["rps"]:.1f}/с, ошибок {route["error_rate"]:.1%}, '
+                f'p50 {route["p50"]:.1f} мс, p95 {route["p95"]:.1f} мс, '
+                f'p99 {route["p99"]:.1f} мс')
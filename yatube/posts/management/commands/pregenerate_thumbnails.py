@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Optional, Tuple
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.models import Post
+from posts.thumbnails import THUMBNAIL_WORKERS, generate_post_thumbnails
+
+# Сколько постов отдаётся потокам за раз: задачи всех постов
+# сразу заняли бы память, пропорциональную числу постов
+PREGENERATE_CHUNK_SIZE = 1000
+
+
+def _generate(post_id: int) -> Tuple[int, bool, Optional[Exception]]:
+    """Returns (post id, whether thumbnails were made, error)."""
+    try:
+        return post_id, generate_post_thumbnails(post_id), None
+    except Exception as e:
+        return post_id, False, e
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок всех постов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=THUMBNAIL_WORKERS,
+                            help='Число потоков, создающих миниатюры')
+        parser.add_argument('--chunk-size', type=int,
+                            default=PREGENERATE_CHUNK_SIZE,
+                            help='Сколько постов обрабатывается за раз')
+
+    def handle(self, *args, **options):
+        post_ids = (Post.
+                    objects.
+                    exclude(image='').
+                    order_by('pk').
+                    values_list('pk', flat=True).
+                    iterator(chunk_size=options['chunk_size']))
+        total = created = failed = 0
+        # Готовые миниатюры находятся в хранилище ключей и не пересоздаются
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                chunk = list(islice(post_ids, options['chunk_size']))
+                if not chunk:
+                    break
+                for post_id, made, error in pool.map(_generate, chunk):
+                    total += 1
+                    created += made
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f'Пост {post_id}: {error!r}')
+        self.stdout.write(f'Постов с картинками: {total}, '
+                          f'с новыми миниатюрами: {created}, '
+                          f'ошибок: {failed}')
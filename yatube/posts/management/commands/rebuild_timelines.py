@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import TimelineEntry
+from posts.timelines import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает ленты подписок пользователей по подпискам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_timelines()
+        self.stdout.write(
+            f'Записей в лентах: {TimelineEntry.objects.count()}')
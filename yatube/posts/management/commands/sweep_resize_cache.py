@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.resize import get_resize_cache
+
+
+class Command(BaseCommand):
+    help = ('Обходит дисковый кэш картинок нужного размера и удаляет '
+            'давно не открытые, если кэш больше RESIZE_CACHE_MAX_BYTES. '
+            'Запускать по расписанию')
+
+    def handle(self, *args, **options):
+        resize_cache = get_resize_cache()
+        size = resize_cache.evict()
+        self.stdout.write(f'В кэше {size} байт из {resize_cache.max_bytes}')
@@ -0,0 +1,163 @@
+import hashlib
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.http import http_date, quote_etag, urlencode
+
+from .feed_cache import (FEED_CACHE_TIMEOUT, get_generation,
+                         get_post_generations)
+from .paginators import CursorPaginator, DeepPage, cursor_for
+from .thumbnails import prefetch_thumbnails
+from .uploads import LimitedImageUploadHandler
+
+
+class CursorPaginationMixin:
+    """ListView mixin adding keyset pagination by ``?after=<cursor>``.
+
+    ``?page=`` URLs keep working, but starting from cursor_from_page
+    the "next" link of a numbered page leads to the cursor page,
+    and pages past the estimated count redirect to it, so deep pages
+    are never fetched with a big OFFSET."""
+    cursor_kwarg: str = 'after'
+    cursor_paginator_class = CursorPaginator
+    cursor_seek_fields = ('created', 'pk')
+    cursor_from_page: int = 10
+
+    def get_cursor_paginator(self, queryset, per_page):
+        return self.cursor_paginator_class(queryset, per_page,
+                                           self.cursor_seek_fields)
+
+    def get_page_objects(self, object_list):
+        """Turns paginated objects into the ones shown on the page."""
+        return object_list
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except DeepPage as e:
+            return redirect(f'{request.path}?'
+                            f'{urlencode({self.cursor_kwarg: e.cursor})}')
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        # Пустой ?after= - это первая страница, а не страница курсора
+        if not cursor:
+            try:
+                paginator, page, object_list, is_paginated = (
+                    super().paginate_queryset(queryset, page_size))
+            except DeepPage as e:
+                # Продолжение - после последнего посчитанного объекта
+                last = queryset[e.counted - 1]
+                raise DeepPage(e.counted,
+                               cursor_for(last, self.cursor_seek_fields))
+            if page.number >= self.cursor_from_page and page.has_next():
+                page.next_cursor = cursor_for(page[len(page) - 1],
+                                              self.cursor_seek_fields)
+        else:
+            paginator = self.get_cursor_paginator(queryset, page_size)
+            try:
+                page = paginator.page(cursor)
+            except InvalidPage as e:
+                raise Http404(str(e))
+            is_paginated = page.has_other_pages()
+
+        page.object_list = self.get_page_objects(page.object_list)
+        return paginator, page, page.object_list, is_paginated
+
+
+class FeedCacheMixin:
+    """ListView mixin providing generations for feed fragment caching.
+
+    feed_generation versions the whole page fragment, post_generations
+    versions fragments of single posts, which are shared by all the
+    pages showing the post. See posts.feed_cache."""
+
+    def get_cache_scope(self) -> Optional[str]:
+        return None
+
+    @cached_property
+    def feed_generation(self) -> Optional[int]:
+        return get_generation(self.get_cache_scope())
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(queryset, per_page,
+                                     count_version=self.feed_generation,
+                                     **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context['page_obj']
+        context['feed_generation'] = self.feed_generation
+        context['feed_cache_timeout'] = FEED_CACHE_TIMEOUT
+        # Считаются, только если фрагмент страницы не нашёлся в кэше
+        context['post_generations'] = SimpleLazyObject(
+            lambda: get_post_generations(page))
+        context['post_thumbnails'] = SimpleLazyObject(
+            lambda: prefetch_thumbnails(page))
+        return context
+
+
+def conditional_response(request, values: List,
+                         last_modified: Optional[datetime],
+                         respond: Callable[[str], HttpResponse]
+                         ) -> HttpResponse:
+    """Answers 304 Not Modified if the client has the page with the
+    validators, otherwise returns respond(etag) with ETag and
+    Last-Modified set."""
+    etag = quote_etag(hashlib.md5(repr(values).encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request,
+                                        etag=etag,
+                                        last_modified=timestamp)
+    if response is None:
+        response = respond(etag)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """View mixin answering 304 Not Modified before any rendering.
+
+    get_validators returns values that change with every change of
+    the page, and its newest modification date. They must be computed
+    by a few indexed queries: much cheaper than the page itself."""
+
+    def get_validators(self) -> Tuple[List, Optional[datetime]]:
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        values, last_modified = self.get_validators()
+        # Страница зависит от пользователя: шапка, кнопки подписки
+        values = [request.user.pk, *values]
+        return conditional_response(
+            request, values, last_modified,
+            lambda etag: super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LimitedImageUploadMixin:
+    """Form view mixin checking image uploads while they stream in,
+    see posts.uploads. Must be the first base of the view.
+
+    The handler has to be installed before the request body is read,
+    and CsrfViewMiddleware reads it, so CSRF is checked here instead."""
+
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, LimitedImageUploadHandler(request))
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['upload_errors'] = getattr(self.request, 'upload_errors', {})
+        return kwargs
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import post_image_storage
+
 User = get_user_model()
 
 
@@ -25,6 +27,24 @@ class Group(models.Model):
         return self.title
 
 
+# Поля поста, которые выводят шаблоны лент
+FEED_FIELDS = ('text', 'created', 'image', 'author', 'group',
+               'image_width', 'image_height', 'image_placeholder',
+               'author__username',
+               'author__first_name',
+               'author__last_name',
+               'group__slug')
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Posts with everything the feed templates show,
+        fetched in one query."""
+        return (self
+                .select_related('author', 'group')
+                .only(*FEED_FIELDS))
+
+
 class Post(CreatedModel):
     text = models.TextField(verbose_name="Текст поста",
                             help_text="Введите текст поста")
@@ -50,16 +70,47 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True
     )
 
+    # Заполняются при сохранении картинки, см. posts.images
+    image_width = models.PositiveIntegerField('Ширина картинки',
+                                              null=True,
+                                              editable=False)
+    image_height = models.PositiveIntegerField('Высота картинки',
+                                               null=True,
+                                               editable=False)
+    image_size = models.PositiveIntegerField('Размер картинки, байт',
+                                             null=True,
+                                             editable=False)
+    image_placeholder = models.TextField('Заглушка картинки',
+                                         blank=True,
+                                         editable=False)
+
+    # Поддерживается сигналами posts.signals
+    comments_count = models.PositiveIntegerField('Комментариев',
+                                                 default=0,
+                                                 editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:15]
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-pk']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы повторяют сортировку лент: (-created, -id)
+        indexes = [
+            models.Index(fields=['-created', '-id'],
+                         name='post_created_idx'),
+            models.Index(fields=['author', '-created', '-id'],
+                         name='post_author_created_idx'),
+            models.Index(fields=['group', '-created', '-id'],
+                         name='post_group_created_idx'),
+        ]
 
 
 class Comment(CreatedModel):
@@ -81,6 +132,10 @@ class Comment(CreatedModel):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -97,3 +152,61 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('author', 'user',)
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
+
+
+class Profile(models.Model):
+    """Счётчики пользователя.
+
+    Поддерживаются сигналами posts.signals, расхождения исправляет
+    команда reconcile_counters."""
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                related_name='profile')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.posts_count}"
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    def feed(self):
+        """Timeline entries with their posts ready for the feed
+        templates, see PostQuerySet.feed."""
+        return (self
+                .select_related('post__author', 'post__group')
+                .only('created', 'post',
+                      *(f'post__{field}' for field in FEED_FIELDS)))
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя.
+
+    Ленты заполняются при записи (fan-out on write): при публикации
+    поста, подписке и отписке, см. posts.signals."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    # Копия post.created: лента читается по индексу без сортировки
+    created = models.DateTimeField()
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user', 'post',)
+        indexes = [
+            models.Index(fields=['user', '-created', '-post'],
+                         name='timeline_user_created_idx'),
+        ]
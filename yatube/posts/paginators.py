@@ -0,0 +1,217 @@
+import base64
+import binascii
+import hashlib
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(key, pk) -> str:
+    """Returns opaque url-safe token pointing right after (key, pk).
+
+    key is the creation date for the feeds or any other sort key,
+    e.g. the search rank."""
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = f'{key},{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str,
+                  parse_key: Callable = parse_datetime) -> Tuple:
+    """Returns (key, pk) pair encoded by encode_cursor.
+
+    Raises InvalidCursor if the token is damaged."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        key, pk = raw.rsplit(',', 1)
+        key, pk = parse_key(key), int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor('Неверный курсор страницы')
+    if key is None:
+        raise InvalidCursor('Неверный курсор страницы')
+    return key, pk
+
+
+def cursor_for(obj, seek_fields: Tuple[str, str] = ('created', 'pk')
+               ) -> str:
+    """Returns the cursor of a model instance or a values() row."""
+    if isinstance(obj, dict):
+        return encode_cursor(*(obj[field] for field in seek_fields))
+    return encode_cursor(*(getattr(obj, field) for field in seek_fields))
+
+
+class DeepPage(Exception):
+    """Page past the counted part of an estimated count.
+
+    Such pages are fetched only with the keyset pagination: their
+    OFFSET is not bounded. Not an InvalidPage, so that views do not
+    turn it into 404.
+
+    Parameters
+    ---------------
+    counted: Number of the counted objects.
+    cursor: Cursor right after the last counted object, if known.
+    """
+
+    def __init__(self, counted: int, cursor: Optional[str] = None):
+        super().__init__(f'Страница дальше {counted} объектов')
+        self.counted = counted
+        self.cursor = cursor
+
+
+class CursorPage(Page):
+    """Page of the keyset pagination.
+
+    Has no number: the page is addressed by the cursor of the
+    previous page last object, and the next page by next_cursor."""
+
+    def __init__(self, object_list, paginator, cursor: Optional[str],
+                 has_next: bool):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+        self.next_cursor = (cursor_for(object_list[-1],
+                                       paginator.seek_fields)
+                            if has_next else None)
+
+    def __repr__(self):
+        return f'<Page after {self.cursor or "start"}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def next_page_number(self):
+        raise InvalidPage('Страницы курсора не нумеруются')
+
+    def previous_page_number(self):
+        raise InvalidPage('Страницы курсора не нумеруются')
+
+
+class CursorPaginator:
+    """Keyset paginator for querysets of CreatedModel descendants.
+
+    Instead of OFFSET each page seeks right after (created, pk) of the
+    previous page last object, so the cost of a page does not depend
+    on its depth.
+
+    Parameters
+    ---------------
+    object_list: QuerySet to paginate, its ordering is replaced
+    with (-created, -pk).
+    per_page: The maximum number of items to include on a page.
+    seek_fields: Fields used for ordering and seeking, the first
+    one is the creation date, the second one is the unique tie-breaker.
+    """
+
+    def __init__(self, object_list, per_page: int,
+                 seek_fields: Tuple[str, str] = ('created', 'pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.seek_fields = seek_fields
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        created_field, pk_field = self.seek_fields
+        queryset = self.object_list.order_by(f'-{created_field}',
+                                             f'-{pk_field}')
+        if cursor:
+            created, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{created_field}__lt': created})
+                | Q(**{created_field: created, f'{pk_field}__lt': pk}))
+
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        return CursorPage(items[:self.per_page], self, cursor or None,
+                          has_next)
+
+    def get_page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Returns the page, falls back to the first one
+        if the cursor is damaged."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class FeedPaginator(Paginator):
+    """Paginator that does not run COUNT(*) on every request.
+
+    Count of a queryset is taken from the cache and is bounded by
+    count_limit items: counting stops there, and the total is
+    marked as estimated. Page links are rendered only for a window
+    around the current page (see get_page_window).
+
+    count_version, if given, is a part of the count cache key:
+    pass the feed generation to drop the count on its change."""
+    count_limit: int = getattr(settings, 'PAGINATOR_COUNT_LIMIT', 10000)
+    count_timeout: int = getattr(settings, 'PAGINATOR_COUNT_TIMEOUT', 60)
+    window_size: int = getattr(settings, 'PAGINATOR_WINDOW_SIZE', 2)
+
+    def __init__(self, *args, count_version=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_version = count_version
+
+    def _count_cache_key(self) -> str:
+        query = str(self.object_list.query).encode()
+        return (f'feed_count:{hashlib.md5(query).hexdigest()}:'
+                f'{self.count_version}')
+
+    @cached_property
+    def count(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        key = self._count_cache_key()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list[:self.count_limit].count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    @property
+    def count_is_estimate(self) -> bool:
+        return self.count >= self.count_limit
+
+    def validate_number(self, number) -> int:
+        """Raises DeepPage for pages past the estimated count instead
+        of EmptyPage."""
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_is_estimate and int(number) > self.num_pages:
+                raise DeepPage(self.count)
+            raise
+
+    def get_page(self, number) -> Page:
+        try:
+            return super().get_page(number)
+        except DeepPage:
+            return self.page(self.num_pages)
+
+    def page(self, number) -> Page:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom
+                                               + self.per_page],
+                              number, self)
+
+    def get_page_window(self, number: int) -> List[int]:
+        """Returns page numbers around the given one, no more than
+        window_size pages on each side."""
+        first = max(number - self.window_size, 1)
+        last = min(number + self.window_size, self.num_pages)
+        return list(range(first, last + 1))
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+
+# Картинки постов нужного размера отдаёт posts.views.ResizedImageView
+# по подписанным ссылкам, готовые копии лежат в дисковом кэше
+RESIZE_MAX_SIDE: int = getattr(settings, 'RESIZE_MAX_SIDE', 2048)
+RESIZE_CACHE_MAX_BYTES: int = getattr(settings, 'RESIZE_CACHE_MAX_BYTES',
+                                      1024 * 1024 * 1024)
+# Полный обход кэша - раз в столько записей: размер, который считает
+# процесс, не видит записей других процессов. Ещё обходит команда
+# sweep_resize_cache
+RESIZE_CACHE_SWEEP_EVERY: int = getattr(settings, 'RESIZE_CACHE_SWEEP_EVERY',
+                                        1000)
+# Вытеснение освобождает место с запасом, до этой доли max_bytes
+RESIZE_CACHE_LOW_WATERMARK: float = 0.9
+# Ссылки неизменяемы: с новой картинкой меняется версия в ссылке
+RESIZE_MAX_AGE: int = 365 * 24 * 60 * 60
+# Масштабы вариантов картинки в srcset относительно её размера на странице
+RESIZE_SRCSET_SCALES: Tuple[float, ...] = getattr(
+    settings, 'RESIZE_SRCSET_SCALES', (0.5, 1, 2))
+
+CROPS = ('center', 'fit')
+FORMATS = {'jpeg': ('JPEG', 'image/jpeg'),
+           'webp': ('WEBP', 'image/webp'),
+           'png': ('PNG', 'image/png')}
+
+_signer = signing.Signer(salt='posts.resize')
+
+
+def get_cache_dir() -> str:
+    return (getattr(settings, 'RESIZE_CACHE_DIR', None)
+            or os.path.join(settings.MEDIA_ROOT, 'resized'))
+
+
+def image_version(image_name: str) -> str:
+    """Short token changing with the post image, it makes the resized
+    image URLs immutable."""
+    return hashlib.sha1(image_name.encode()).hexdigest()[:12]
+
+
+def _signed_value(post_id: int, version: str, width: int, height: int,
+                  crop: str, fmt: str) -> str:
+    return f'{post_id}:{version}:{width}x{height}:{crop}:{fmt}'
+
+
+def sign_resize(*args) -> str:
+    return _signer.signature(_signed_value(*args))
+
+
+def check_resize_signature(signature: str, *args) -> bool:
+    return constant_time_compare(signature, sign_resize(*args))
+
+
+def resized_image_url(post, width: int, height: int,
+                      crop: str = 'center', fmt: str = 'jpeg') -> str:
+    """Returns the signed URL of the post image resized to width x height.
+
+    Does not touch the image: the copy is made on the first request."""
+    version = image_version(post.image.name)
+    args = (post.pk, version, width, height, crop, fmt)
+    return reverse('posts:resized_image',
+                   kwargs={'signature': sign_resize(*args),
+                           'post_id': post.pk,
+                           'version': version,
+                           'width': width,
+                           'height': height,
+                           'crop': crop,
+                           'fmt': fmt})
+
+
+def resized_srcset(post, width: int, height: int,
+                   crop: str = 'center', fmt: str = 'jpeg') -> str:
+    """Returns srcset value with RESIZE_SRCSET_SCALES variants."""
+    variants: List[str] = []
+    for scale in RESIZE_SRCSET_SCALES:
+        scaled_width = min(int(width * scale), RESIZE_MAX_SIDE)
+        scaled_height = min(int(height * scale), RESIZE_MAX_SIDE)
+        url = resized_image_url(post, scaled_width, scaled_height, crop, fmt)
+        variants.append(f'{url} {scaled_width}w')
+    return ', '.join(variants)
+
+
+def resize_image(source, width: int, height: int, crop: str,
+                 fmt: str) -> bytes:
+    """Returns the source image file resized and encoded in fmt.
+
+    center crop fills width x height exactly, fit keeps proportions
+    within it."""
+    image_format = FORMATS[fmt][0]
+    with Image.open(source) as image:
+        if image.format == 'JPEG':
+            image.draft('RGB', (width, height))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    if crop == 'center':
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        image.thumbnail((width, height), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=85)
+    return buffer.getvalue()
+
+
+class ResizeCache:
+    """Disk cache of resized images with LRU eviction by total size.
+
+    Opening a file bumps its modification time. The size of the cache
+    is kept as a running total of the writes; when it grows over
+    max_bytes, the cache is walked and the least recently used files
+    are removed. Every sweep_every writes the cache is walked anyway
+    to correct the total.
+
+    Parameters
+    ---------------
+    directory: Directory of the cache, created on the first write.
+    max_bytes: Total size of the files to keep.
+    sweep_every: Number of writes between two walks of the cache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int,
+                 sweep_every: int = RESIZE_CACHE_SWEEP_EVERY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self.lock = threading.Lock()
+        self.size = 0
+        self.writes = 0
+
+    def path(self, version: str, width: int, height: int, crop: str,
+             fmt: str) -> str:
+        return os.path.join(self.directory, version[:2],
+                            f'{version}-{width}x{height}-{crop}.{fmt}')
+
+    def open(self, path: str) -> Optional[BinaryIO]:
+        """Returns the cached file opened, or None on a cache miss."""
+        try:
+            cached = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return cached
+
+    def put(self, path: str, content: bytes) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Запись во временный файл и переименование: параллельный
+        # запрос никогда не увидит недописанную картинку
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            self.size += len(content)
+            self.writes += 1
+            sweep = (self.size > self.max_bytes
+                     or self.writes >= self.sweep_every)
+            if sweep:
+                self.writes = 0
+        if sweep:
+            self.evict()
+        return path
+
+    def files(self) -> List[Tuple[float, int, str]]:
+        """Returns (modification time, size, path) of the cached files."""
+        files = []
+        for root, directories, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self) -> int:
+        """Walks the cache and, if it is over max_bytes, removes the
+        least recently used files down to RESIZE_CACHE_LOW_WATERMARK
+        of it. Returns the size of the cache left."""
+        files = self.files()
+        total = sum(size for modified, size, path in files)
+        if total > self.max_bytes:
+            target = self.max_bytes * RESIZE_CACHE_LOW_WATERMARK
+            for modified, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with self.lock:
+            self.size = total
+        return total
+
+
+_resize_caches: Dict[Tuple[str, int], ResizeCache] = {}
+
+
+def get_resize_cache() -> ResizeCache:
+    """Returns the cache of the process: it keeps the running total."""
+    key = (get_cache_dir(), RESIZE_CACHE_MAX_BYTES)
+    if key not in _resize_caches:
+        _resize_caches[key] = ResizeCache(*key)
+    return _resize_caches[key]
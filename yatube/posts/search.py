@@ -0,0 +1,157 @@
+import re
+from typing import Optional
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginators import CursorPage, decode_cursor
+
+# Полнотекстовый индекс постов: внешняя таблица содержимого FTS5,
+# текст хранится только в posts_post, индекс обновляют триггеры
+FTS_TABLE = 'posts_post_fts'
+
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    f"USING fts5(text, content='posts_post', content_rowid='id')"
+)
+
+CREATE_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+)
+
+REBUILD_INDEX = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+TRIGGER_NAMES = (f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete',
+                 f'{FTS_TABLE}_update')
+
+
+def install_search(using: str = 'default', rebuild: bool = False):
+    """Creates the full-text index and its triggers if they are missing.
+
+    SQLite drops triggers with the table, and migrations altering
+    posts_post recreate it, so this runs after every migrate."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute(CREATE_FTS_TABLE)
+        for trigger in CREATE_TRIGGERS:
+            cursor.execute(trigger)
+        if rebuild:
+            cursor.execute(REBUILD_INDEX)
+
+
+def drop_search_triggers(using: str = 'default'):
+    """Stops index updates, e.g. for a bulk load: the index is then
+    brought back by install_search(rebuild=True)."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        for trigger in TRIGGER_NAMES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def install_search_after_migrate(sender, using='default', **kwargs):
+    # Миграции posts могут быть ещё не применены, например
+    # migrate до нуля или migrate другого приложения
+    db = connections[using]
+    if Post._meta.db_table not in db.introspection.table_names():
+        return
+    install_search(using)
+
+
+def to_match_query(text: str) -> str:
+    """Turns user input into FTS5 query: all the words as phrases,
+    so the query syntax characters are never interpreted."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def search_post_ids(text: str) -> RawSQL:
+    """Subquery of ids of the posts matching the text."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} "
+                  f"WHERE {FTS_TABLE} MATCH %s",
+                  (to_match_query(text),))
+
+
+class SearchPaginator:
+    """Keyset paginator of the search results ranked by bm25.
+
+    Pages are addressed by the (rank, id) cursor of the previous page
+    last post, so deep pages cost the same as the first one.
+
+    Parameters
+    ---------------
+    text: Search query as the user typed it.
+    per_page: The maximum number of items to include on a page.
+    group_id, author_id: Optional filters of the results.
+    """
+    seek_fields = ('search_rank', 'pk')
+
+    def __init__(self, text: str, per_page: int,
+                 group_id: Optional[int] = None,
+                 author_id: Optional[int] = None):
+        self.query = to_match_query(text)
+        self.per_page = int(per_page)
+        self.group_id = group_id
+        self.author_id = author_id
+
+    def _fetch_ranks(self, cursor: Optional[str]):
+        sql = [f"SELECT {FTS_TABLE}.rowid, rank FROM {FTS_TABLE}"]
+        params = []
+        conditions = [f"{FTS_TABLE} MATCH %s"]
+        params.append(self.query)
+        if self.group_id is not None or self.author_id is not None:
+            sql.append("INNER JOIN posts_post AS post "
+                       f"ON post.id = {FTS_TABLE}.rowid")
+        if self.group_id is not None:
+            conditions.append("post.group_id = %s")
+            params.append(self.group_id)
+        if self.author_id is not None:
+            conditions.append("post.author_id = %s")
+            params.append(self.author_id)
+        if cursor:
+            rank, pk = decode_cursor(cursor, float)
+            conditions.append(f"(rank > %s OR (rank = %s "
+                              f"AND {FTS_TABLE}.rowid < %s))")
+            params += [rank, rank, pk]
+        sql.append("WHERE " + " AND ".join(conditions))
+        sql.append(f"ORDER BY rank, {FTS_TABLE}.rowid DESC LIMIT %s")
+        params.append(self.per_page + 1)
+
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(" ".join(sql), params)
+            return db_cursor.fetchall()
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        if not self.query:
+            return CursorPage([], self, None, False)
+
+        ranks = self._fetch_ranks(cursor)
+        has_next = len(ranks) > self.per_page
+        ranks = ranks[:self.per_page]
+        posts = Post.objects.feed().in_bulk([pk for pk, rank in ranks])
+        results = []
+        for pk, rank in ranks:
+            if pk in posts:
+                posts[pk].search_rank = rank
+                results.append(posts[pk])
+        return CursorPage(results, self, cursor or None,
+                          has_next and bool(results))
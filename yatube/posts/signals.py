@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .counters import change_comments_counter, change_profile_counter
+from .feed_cache import (INDEX_SCOPE, bump_generations,
+                         bump_post_generations, group_scope, post_scope,
+                         profile_scope)
+from .images import (IMAGE_ERRORS, clear_image_metadata,
+                     fill_image_metadata)
+from .models import Comment, Follow, Group, Post
+from .thumbnails import schedule_thumbnails
+from .timelines import (backfill_timeline, bump_follower_timelines,
+                        fan_out_post, prune_timeline)
+
+# Поля пользователя, которые выводят фрагменты лент
+AUTHOR_NAME_FIELDS = ('first_name', 'last_name')
+
+
+def bump_posts_generations(posts, *scopes: str):
+    """Invalidates the posts, the groups they are in and the scopes."""
+    groups = set()
+    for pk, group_id in posts.values_list('pk', 'group_id').iterator():
+        scopes += (post_scope(pk),)
+        if group_id is not None:
+            groups.add(group_scope(group_id))
+    bump_generations(*scopes, *groups)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Пост могли перенести в другую группу: её кэш тоже устарел,
+    # а новой картинке нужны миниатюры
+    if instance.pk:
+        instance._old_group_id, instance._old_image = (
+            Post.
+            objects.
+            filter(pk=instance.pk).
+            values_list('group_id', 'image').
+            first() or (None, None))
+    if instance.image != getattr(instance, '_old_image', None):
+        try:
+            fill_image_metadata(instance)
+        except IMAGE_ERRORS:
+            # Пост сохраняется и без размеров картинки
+            clear_image_metadata(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_profile_counter(instance.author_id, 'posts_count', 1)
+        fan_out_post(instance)
+    if instance.image and instance.image != getattr(instance, '_old_image',
+                                                    None):
+        schedule_thumbnails(instance)
+    bump_post_generations(instance, getattr(instance, '_old_group_id', None))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_profile_counter(instance.author_id, 'posts_count', -1)
+    bump_post_generations(instance)
+    bump_follower_timelines(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comments_counter(instance.post_id, 1)
+        bump_generations(post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_counter(instance.post_id, -1)
+    bump_generations(post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_profile_counter(instance.author_id, 'followers_count', 1)
+        change_profile_counter(instance.user_id, 'following_count', 1)
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_profile_counter(instance.author_id, 'followers_count', -1)
+    change_profile_counter(instance.user_id, 'following_count', -1)
+    prune_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    # Название, описание и адрес группы кэшируются в её ленте
+    # и в карточках её постов
+    if not created and not raw:
+        bump_posts_generations(Post.objects.filter(group=instance),
+                               INDEX_SCOPE, group_scope(instance.pk))
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def user_changing(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+            AUTHOR_NAME_FIELDS):
+        return
+    old_name = (sender.
+                objects.
+                filter(pk=instance.pk).
+                values_list(*AUTHOR_NAME_FIELDS).
+                first())
+    new_name = tuple(getattr(instance, field)
+                     for field in AUTHOR_NAME_FIELDS)
+    instance._name_changed = old_name is not None and old_name != new_name
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, raw=False, **kwargs):
+    # Имя автора кэшируется в его профиле и в карточках его постов
+    if getattr(instance, '_name_changed', False):
+        instance._name_changed = False
+        bump_posts_generations(Post.objects.filter(author=instance),
+                               INDEX_SCOPE, profile_scope(instance.pk))
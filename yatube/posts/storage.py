@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Iterator
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """File storage naming files by the sha256 of their content.
+
+    A file uploaded to posts/ is stored as posts/ab/cd/abcd...ef.jpg,
+    two levels of subdirectories keep directories small. A file with
+    the same content is stored once: saving it again returns the name
+    of the stored copy, so its sorl thumbnails are reused as well.
+    Files are shared between posts, so they are never deleted with
+    a post, see the collect_media_garbage command."""
+
+    def content_name(self, name: str, content) -> str:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        directory, file_name = os.path.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+        return os.path.join(directory,
+                            content_hash[:2],
+                            content_hash[2:4],
+                            f'{content_hash}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.content_name(name, content)
+        try:
+            # Копия уже есть. Новое время изменения не даёт
+            # collect_media_garbage удалить её, пока пост не сохранён
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
+        return name
+
+    def walk(self, directory: str) -> Iterator[str]:
+        """Yields names of all the files under the directory."""
+        if not self.exists(directory):
+            return
+        directories, files = self.listdir(directory)
+        for file_name in files:
+            yield os.path.join(directory, file_name)
+        for subdirectory in directories:
+            yield from self.walk(os.path.join(directory, subdirectory))
+
+
+post_image_storage = ContentHashStorage()
@@ -0,0 +1,15 @@
+from django import template
+from django.core.paginator import Page
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page: Page):
+    """Page numbers to render links for: the window around the page
+    for FeedPaginator, the whole page_range for other paginators and
+    nothing for paginators without page numbers."""
+    get_page_window = getattr(page.paginator, 'get_page_window', None)
+    if get_page_window is not None:
+        return get_page_window(page.number)
+    return getattr(page.paginator, 'page_range', [])
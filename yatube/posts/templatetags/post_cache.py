@@ -0,0 +1,9 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def generation_of(post_generations, post):
+    """Generation of the post to version its cached fragment."""
+    return post_generations.get(post.pk)
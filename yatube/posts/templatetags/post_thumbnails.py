@@ -0,0 +1,46 @@
+from django import template
+from sorl.thumbnail.images import ImageFile
+
+from ..resize import resized_srcset
+from ..thumbnails import POST_THUMBNAILS, get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_thumbnail(context, post, name='card'):
+    """Returns the named thumbnail of the post image, or the original
+    image while the thumbnail is being made in background. Both know
+    their size without opening the file.
+
+    Thumbnails are taken from post_thumbnails of the context, prefetched
+    for the whole page by posts.thumbnails.prefetch_thumbnails, and are
+    looked up one by one only for the posts missing there. Rendering
+    never queues thumbnails: it would write to the database on GET.
+
+    Usage: {% post_thumbnail post 'card' as im %}"""
+    if not post.image:
+        return None
+    prefetched = context.get('post_thumbnails') or {}
+    if (post.pk, name) in prefetched:
+        thumbnail = prefetched[post.pk, name]
+    else:
+        thumbnail = get_ready_thumbnail(post.image, name)
+    if thumbnail is None:
+        original = ImageFile(post.image)
+        if post.image_width and post.image_height:
+            original.set_size((post.image_width, post.image_height))
+        return original
+    return thumbnail
+
+
+@register.simple_tag
+def post_image_srcset(post, name='card', fmt='jpeg'):
+    """Returns srcset of the post image resized on demand to the named
+    thumbnail geometry at several scales, see posts.resize.
+
+    Usage: <img srcset="{% post_image_srcset post 'card' 'webp' %}">"""
+    geometry, options = POST_THUMBNAILS[name]
+    width, height = (int(side) for side in geometry.split('x'))
+    crop = 'center' if options.get('crop') else 'fit'
+    return resized_srcset(post, width, height, crop, fmt)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = Client()
+        cls.author = User.objects.create_user("author", first_name="Лев")
+        cls.reader = User.objects.create_user("reader")
+        cls.group = Group.objects.create(title="Котики", slug="cats",
+                                         description="Про котиков")
+        cls.posts = [Post.objects.create(text=f"Пост {post_number}",
+                                         author=cls.author,
+                                         group=cls.group)
+                     for post_number in range(5)]
+        cls.comment = Comment.objects.create(post=cls.posts[-1],
+                                             author=cls.reader,
+                                             text="Комментарий")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, name, *args, **params):
+        return PostApiTests.client.get(reverse(f'api:{name}', args=args),
+                                       params)
+
+    def test_post_lists(self):
+        newest = PostApiTests.posts[-1]
+        lists = {
+            'posts': (),
+            'group_posts': ('cats',),
+            'profile_posts': ('author',),
+        }
+        for name, args in lists.items():
+            with self.subTest(name=name):
+                with self.assertNumQueries(1 if not args else 2):
+                    data = self.get(name, *args, limit=2).json()
+                self.assertEquals(len(data['results']), 2)
+                self.assertEquals(data['results'][0]['id'], newest.pk)
+                self.assertEquals(data['results'][0]['author'], 'author')
+                self.assertEquals(data['results'][0]['group'], 'cats')
+                self.assertEquals(data['results'][0]['comments_count'], 1)
+
+    def test_cursor_pagination(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['after'] = cursor
+            data = self.get('posts', **params).json()
+            seen += [post['id'] for post in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEquals(seen,
+                          [post.pk for post in reversed(PostApiTests.posts)])
+
+    def test_sparse_fields(self):
+        data = self.get('posts', fields='id,text').json()
+        self.assertEquals(set(data['results'][0]), {'id', 'text'})
+
+        response = self.get('posts', fields='id,password')
+        self.assertEquals(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_bad_cursor(self):
+        self.assertEquals(self.get('posts', after='broken').status_code, 400)
+
+    def test_follow(self):
+        self.assertEquals(self.get('follow').status_code, 401)
+
+        client = Client()
+        client.force_login(PostApiTests.reader)
+        data = client.get(reverse('api:follow'), {'fields': 'id,text'}).json()
+        self.assertEquals([post['id'] for post in data['results']],
+                          [post.pk for post in reversed(PostApiTests.posts)])
+        self.assertEquals(data['results'][0]['text'], "Пост 4")
+
+    def test_post_detail(self):
+        post = PostApiTests.posts[-1]
+        data = self.get('post', post.pk).json()
+        self.assertEquals(data['text'], post.text)
+        self.assertEquals(data['comments']['results'][0]['text'],
+                          "Комментарий")
+        self.assertEquals(
+            self.get('post_comments', post.pk).json()['results'][0]['id'],
+            PostApiTests.comment.pk)
+        self.assertEquals(self.get('post', 0).status_code, 404)
+
+    def test_groups_and_profiles(self):
+        data = self.get('groups').json()
+        self.assertEquals(data['results'][0]['slug'], 'cats')
+        self.assertIsNone(data['next'])
+        self.assertEquals(self.get('group', 'cats').json()['title'],
+                          "Котики")
+
+        data = self.get('profile', 'author').json()
+        self.assertEquals(data['first_name'], "Лев")
+        self.assertEquals(data['posts_count'], 5)
+        self.assertEquals(data['followers_count'], 1)
+        self.assertEquals(self.get('profile', 'nobody').status_code, 404)
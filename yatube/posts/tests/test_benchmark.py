@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..benchmark import DatasetGenerator
+from ..models import Comment, Follow, Group, Post
+
+
+class BenchmarkTests(TestCase):
+    def test_dataset_is_reproducible(self):
+        until = timezone.now()
+
+        def records():
+            return list(DatasetGenerator(users=10, groups=2, posts=20,
+                                         comments=10, follows=10,
+                                         seed=1, until=until).records())
+        self.assertEquals(records(), records())
+
+    def test_benchmark_command(self):
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+
+        call_command('benchmark', '--generate', '--users=20', '--groups=2',
+                     '--posts=50', '--comments=40', '--follows=30',
+                     '--requests=2', f'--output={path}', stdout=StringIO())
+        self.assertEquals(Post.objects.count(), 50)
+        self.assertEquals(Group.objects.count(), 2)
+        self.assertEquals(Comment.objects.count(), 40)
+        self.assertTrue(Follow.objects.exists())
+
+        with open(path) as output:
+            results = json.load(output)
+        routes = results['routes']
+        for name in ('posts:index', 'posts:group_list', 'posts:profile',
+                     'posts:post_detail', 'posts:follow_index',
+                     'about:author', 'users:login'):
+            with self.subTest(name=name):
+                self.assertEquals(routes[name]['status'], 200)
+                self.assertEquals(
+                    set(routes[name]['warm']), {'min', 'median', 'p95',
+                                                'max'})
+        self.assertIn('skipped', routes['posts:profile_follow'])
+
+        out = StringIO()
+        call_command('benchmark', '--requests=1', f'--output={path}',
+                     f'--compare={path}', stdout=out)
+        self.assertIn('posts:index: ', out.getvalue())
@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user("author")
+        cls.reader = User.objects.create_user("reader")
+        cls.staff = User.objects.create_user("staff", is_staff=True)
+        cls.group = Group.objects.create(title="Котики", slug="cats",
+                                         description="Про котиков")
+        cls.posts = [Post.objects.create(text=f"Пост {post_number}",
+                                         author=cls.author,
+                                         group=cls.group)
+                     for post_number in range(3)]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text="Комментарий")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args):
+        descriptor, path = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+        call_command('export_yatube', path, *args, stdout=StringIO())
+        return path
+
+    def read_records(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as export:
+            return [json.loads(line) for line in export]
+
+    def test_export_command(self):
+        records = self.read_records(self.export('--chunk-size=2'))
+        self.assertEquals([record['type'] for record in records],
+                          ['group', 'post', 'post', 'post',
+                           'comment', 'follow'])
+        self.assertEquals([record['id'] for record in records[1:4]],
+                          sorted(post.pk for post in ExportTests.posts))
+        self.assertEquals(records[1]['author'], 'author')
+        self.assertEquals(records[1]['group'], 'cats')
+        self.assertEquals(records[4]['post'], ExportTests.posts[0].pk)
+        self.assertEquals(records[5], {'type': 'follow',
+                                       'user': 'reader',
+                                       'author': 'author'})
+
+    def test_export_is_importable(self):
+        path = self.export()
+        Post.objects.all().delete()
+        call_command('import_yatube', path, stdout=StringIO())
+        self.assertEquals(Post.objects.count(), 3)
+        self.assertEquals(Post.objects.get(
+            pk=ExportTests.posts[0].pk).comments_count, 1)
+
+    def test_export_view(self):
+        client = Client()
+        url = reverse('posts:export')
+        self.assertTemplateUsed(client.get(url), 'core/403.html')
+
+        client.force_login(ExportTests.staff)
+        response = client.get(url)
+        self.assertEquals(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEquals(len(content.decode().splitlines()), 6)
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = Client()
+        cls.author = User.objects.create_user("author", first_name="Лев",
+                                              last_name="Толстой")
+        cls.group = Group.objects.create(title="Котики", slug="cats",
+                                         description="Про котиков")
+        cls.post = Post.objects.create(text="Пост про котиков",
+                                       author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', args=['cats']): 'application/rss+xml',
+            reverse('posts:group_atom', args=['cats']):
+                'application/atom+xml',
+            reverse('posts:profile_rss', args=['author']):
+                'application/rss+xml',
+            reverse('posts:profile_atom', args=['author']):
+                'application/atom+xml',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = PostFeedsTests.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type))
+                self.assertContains(response, "Пост про котиков")
+                self.assertContains(response, "Лев Толстой")
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'mirror.test'])
+    def test_feed_is_cached_per_host(self):
+        url = reverse('posts:index_rss')
+        link = reverse('posts:post_detail', args=[PostFeedsTests.post.pk])
+        response = PostFeedsTests.client.get(url)
+        self.assertContains(response, f'http://testserver{link}')
+
+        response = PostFeedsTests.client.get(url, HTTP_HOST='mirror.test',
+                                             secure=True)
+        self.assertContains(response, f'https://mirror.test{link}')
+        self.assertNotContains(response, 'testserver')
+
+    def test_missing_group_feed(self):
+        response = PostFeedsTests.client.get(
+            reverse('posts:group_rss', args=['dogs']))
+        self.assertEquals(response.status_code, 404)
+
+    def test_conditional_feed(self):
+        url = reverse('posts:group_rss', args=['cats'])
+        etag = PostFeedsTests.client.get(url)['ETag']
+
+        with self.assertNumQueries(2):
+            response = PostFeedsTests.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+
+        Post.objects.create(text="Новый пост", author=PostFeedsTests.author,
+                            group=PostFeedsTests.group)
+        response = PostFeedsTests.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEquals(response['ETag'], etag)
+        self.assertContains(response, "Новый пост")
+
+    def test_feed_is_rendered_once_per_generation(self):
+        url = reverse('posts:index_rss')
+        first = PostFeedsTests.client.get(url)
+        with self.assertNumQueries(1):
+            second = PostFeedsTests.client.get(url)
+        self.assertEquals(first.content, second.content)
@@ -1,10 +1,25 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.test import (TestCase, Client, RequestFactory,
+                         override_settings)
+from PIL import Image
+from ..forms import PostForm
+from ..images import MASTER_IMAGE_SIDE, broken_image_message
 from ..models import Group, Post, Comment
+from ..uploads import LimitedImageUploadHandler
 from django.urls import reverse
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION_TAG = 0x0112
+
 
 class PostTestForms(TestCase):
     @classmethod
@@ -212,3 +227,79 @@ class PostTestForms(TestCase):
         self.assertRedirects(
             response,
             '/auth/login/?next=/posts/1/comment/')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user("author")
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def create_jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = orientation
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG',
+                                                      exif=exif)
+        return buffer.getvalue()
+
+    def test_stored_image_is_bounded_and_oriented(self):
+        # Ориентация 6: камеру держали боком, картинку надо повернуть
+        upload = SimpleUploadedFile('photo.jpg',
+                                    self.create_jpeg(3000, 1000, 6),
+                                    content_type='image/jpeg')
+        response = PostImageUploadTests.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Post with photo', 'image': upload})
+        self.assertEquals(response.status_code, 302)
+
+        post = Post.objects.get(text='Post with photo')
+        with Image.open(post.image.path) as image:
+            self.assertEquals(max(image.size), MASTER_IMAGE_SIDE)
+            self.assertGreater(image.height, image.width)
+            self.assertNotIn(ORIENTATION_TAG, image.getexif())
+        self.assertEquals((post.image_width, post.image_height), image.size)
+
+    def test_truncated_image_is_a_form_error(self):
+        data = self.create_jpeg(400, 300)
+        upload = SimpleUploadedFile('photo.jpg', data[:len(data) // 2],
+                                    content_type='image/jpeg')
+        response = PostImageUploadTests.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Post with broken photo', 'image': upload})
+        self.assertEquals(response.status_code, 200)
+        self.assertFormError(response, 'form', 'image',
+                             broken_image_message())
+        self.assertFalse(
+            Post.objects.filter(text='Post with broken photo').exists())
+
+    def test_upload_handler_rejects_too_many_pixels(self):
+        request = RequestFactory().post('/')
+        handler = LimitedImageUploadHandler(request, max_pixels=100)
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        with self.assertRaises(SkipFile):
+            handler.receive_data_chunk(self.create_jpeg(20, 20), 0)
+        self.assertIn('image', request.upload_errors)
+
+        form = PostForm(data={'text': 'Post'},
+                        upload_errors=request.upload_errors)
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_csrf_is_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(PostImageUploadTests.author)
+        response = client.post(reverse('posts:post_create'),
+                               data={'text': 'Post without csrf'})
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(
+            Post.objects.filter(text='Post without csrf').exists())
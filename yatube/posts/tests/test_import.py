@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..search import search_post_ids
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'group', 'slug': 'cats', 'title': 'Котики'},
+    {'type': 'user', 'username': 'author', 'first_name': 'Автор'},
+    {'type': 'post', 'id': 100, 'author': 'author', 'group': 'cats',
+     'text': 'Первый пост про котиков', 'created': '2020-01-02T10:00:00'},
+    {'type': 'post', 'id': 101, 'author': 'author',
+     'text': 'Второй пост', 'created': '2020-01-03T10:00:00'},
+    {'type': 'post', 'author': 'newcomer', 'text': 'Пост без id'},
+    {'type': 'comment', 'post': 100, 'author': 'reader',
+     'text': 'Хороший пост'},
+    {'type': 'comment', 'post': 100, 'author': 'author',
+     'text': 'Спасибо'},
+    {'type': 'follow', 'user': 'reader', 'author': 'author'},
+    {'type': 'follow', 'user': 'reader', 'author': 'author'},
+]
+
+
+class ImportCommandTests(TestCase):
+    def import_records(self, records, *args):
+        descriptor, path = tempfile.mkstemp(suffix='.jsonl')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as source:
+            for record in records:
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out = StringIO()
+        call_command('import_yatube', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        out = self.import_records(RECORDS, '--batch-size=2')
+        self.assertIn('post: 3', out)
+
+        author = User.objects.get(username='author')
+        reader = User.objects.get(username='reader')
+        self.assertEquals(author.first_name, 'Автор')
+        self.assertFalse(reader.has_usable_password())
+        self.assertTrue(User.objects.filter(username='newcomer').exists())
+
+        post = Post.objects.get(pk=100)
+        self.assertEquals(post.group, Group.objects.get(slug='cats'))
+        self.assertEquals(post.created,
+                          timezone.make_aware(datetime(2020, 1, 2, 10)))
+        self.assertEquals(post.comments_count, 2)
+        self.assertEquals(Comment.objects.count(), 2)
+        self.assertEquals(Follow.objects.count(), 1)
+
+        self.assertEquals(author.profile.posts_count, 2)
+        self.assertEquals(author.profile.followers_count, 1)
+        self.assertEquals(
+            list(TimelineEntry.
+                 objects.
+                 filter(user=reader).
+                 order_by('-created').
+                 values_list('post_id', flat=True)),
+            [101, 100])
+        self.assertEquals(
+            list(Post.objects.filter(pk__in=search_post_ids('котиков')).
+                 values_list('pk', flat=True)),
+            [100])
+
+        # Посты, созданные после импорта, попадают в индекс
+        new_post = Post.objects.create(text='Новый пост про котиков',
+                                       author=author)
+        self.assertEquals(Post.objects.get(text='Пост без id').pk, 102)
+        self.assertEquals(new_post.pk, 103)
+        self.assertEquals(
+            list(Post.objects.filter(pk__in=search_post_ids('Новый')).
+                 values_list('pk', flat=True)),
+            [103])
+
+    def test_import_with_rebuild(self):
+        self.import_records(RECORDS, '--rebuild')
+        author = User.objects.get(username='author')
+        self.assertEquals(Post.objects.get(pk=100).comments_count, 2)
+        self.assertEquals(author.profile.posts_count, 2)
+        self.assertEquals(TimelineEntry.objects.count(), 2)
+        self.assertEquals(
+            list(Post.objects.filter(pk__in=search_post_ids('котиков')).
+                 values_list('pk', flat=True)),
+            [100])
+
+    def test_import_updates_only_affected_rows(self):
+        other = User.objects.create_user('other')
+        Post.objects.create(text='Старый пост', author=other)
+        with mock.patch('posts.importer.reconcile_counters') as reconcile, \
+                mock.patch('posts.importer.rebuild_timelines') as rebuild:
+            self.import_records(RECORDS)
+        reconcile.assert_not_called()
+        rebuild.assert_not_called()
+        self.assertEquals(other.profile.posts_count, 1)
+        self.assertEquals(
+            User.objects.get(username='reader').profile.following_count, 1)
+        self.assertEquals(Post.objects.get(pk=100).comments_count, 2)
+
+    def test_missing_key(self):
+        records = [RECORDS[1], {'type': 'comment', 'author': 'author',
+                                'text': 'Комментарий без поста'}]
+        with self.assertRaisesMessage(CommandError, 'Строка 2: нет поля post'):
+            self.import_records(records)
+        with self.assertRaisesMessage(CommandError,
+                                      'Строка 1: post должен быть числом'):
+            self.import_records([{'type': 'comment', 'post': 'first',
+                                  'author': 'author', 'text': 'Текст'}])
+
+    def test_import_is_repeatable(self):
+        records = [record for record in RECORDS if record['type'] != 'comment']
+        self.import_records(records)
+        self.import_records(records)
+        self.assertEquals(Post.objects.filter(pk__in=(100, 101)).count(), 2)
+        self.assertEquals(Group.objects.count(), 1)
+        self.assertEquals(Follow.objects.count(), 1)
+
+    def test_feed_scopes_are_bumped_once(self):
+        with mock.patch('posts.importer.bump_generations') as bump:
+            self.import_records(RECORDS)
+        bump.assert_called_once()
+        scopes = bump.call_args[0]
+        author = User.objects.get(username='author')
+        self.assertIn('index', scopes)
+        self.assertIn(f'profile:{author.pk}', scopes)
+        # Комментарии не добавляют поколений постов
+        self.assertFalse([scope for scope in scopes
+                          if scope.startswith('post:')])
+
+    def test_unknown_group(self):
+        with self.assertRaisesMessage(CommandError, 'Нет группы dogs'):
+            self.import_records([{'type': 'post', 'author': 'author',
+                                  'group': 'dogs', 'text': 'Пост'}])
+
+    def test_import_csv(self):
+        descriptor, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as source:
+            source.write('author,text,group\n'
+                         'author,"Пост, из CSV",\n')
+        call_command('import_yatube', path, '--format=csv', '--type=post',
+                     stdout=StringIO())
+        post = Post.objects.get(text='Пост, из CSV')
+        self.assertIsNone(post.group)
+        self.assertEquals(post.author.profile.posts_count, 1)
+
+    def test_csv_missing_key(self):
+        descriptor, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as source:
+            source.write('author,text\n'
+                         'author,Пост\n'
+                         ',Пост без автора\n')
+        with self.assertRaisesMessage(CommandError,
+                                      'Строка 3: нет поля author'):
+            call_command('import_yatube', path, '--format=csv',
+                         '--type=post', stdout=StringIO())
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from ..load_test import LOAD_MIX, percentile, report, serve
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+# Сервер отвечает из своих потоков, им нужны закоммиченные данные.
+# Клиент один: запись из нескольких потоков в тестовую базу sqlite
+# в памяти падает с "database table is locked"
+class LoadTestTests(TransactionTestCase):
+    def setUp(self) -> None:
+        author = User.objects.create_user("author")
+        reader = User.objects.create_user("reader")
+        group = Group.objects.create(title="Котики", slug="cats",
+                                     description="Про котиков")
+        for post_number in range(5):
+            Post.objects.create(text=f"Пост {post_number}", author=author,
+                                group=group)
+        Follow.objects.create(user=reader, author=author)
+
+    def test_load_test_command(self):
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command('load_test', '--threads=1', '--requests=80',
+                     '--sessions=2', '--mix=posts:add_comment=20',
+                     f'--output={path}', stdout=out)
+        with open(path) as output:
+            routes = json.load(output)['routes']
+
+        self.assertEquals(routes['total']['requests'], 80)
+        self.assertEquals(routes['total']['errors'], 0)
+        self.assertEquals(set(routes) - {'total'}, set(LOAD_MIX))
+        for name in LOAD_MIX:
+            with self.subTest(name=name):
+                route = routes[name]
+                self.assertGreater(route['requests'], 0)
+                self.assertLessEqual(route['p50'], route['p95'])
+                self.assertLessEqual(route['p95'], route['p99'])
+        self.assertEquals(Comment.objects.count(),
+                          routes['posts:add_comment']['requests'])
+        self.assertIn('posts:index: ', out.getvalue())
+
+    def test_load_test_of_running_server(self):
+        server = serve()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+
+        out = StringIO()
+        call_command('load_test', '--threads=1', '--requests=10',
+                     '--sessions=1', f'--url=http://{host}:{port}',
+                     stdout=out)
+        self.assertIn(f'Нагрузка на http://{host}:{port}/', out.getvalue())
+        self.assertIn('total: 10 запросов', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('load_test', '--url=https://example.com',
+                         stdout=StringIO())
+
+    def test_report(self):
+        self.assertEquals(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEquals(percentile([1, 2, 3, 4], 99), 4)
+        routes = report([('posts:index', 0.1, 200),
+                         ('posts:index', 0.3, 500),
+                         ('posts:profile_follow', 0.2, 200)],
+                        Counter({'posts:group_list': 1}), elapsed=2)
+        self.assertEquals(routes['posts:index']['error_rate'], 0.5)
+        self.assertEquals(routes['posts:index']['rps'], 1)
+        self.assertEquals(routes['posts:profile_follow']['errors'], 1)
+        self.assertEquals(routes['posts:group_list']['skipped'], 1)
+        self.assertEquals(routes['total']['requests'], 3)
+        self.assertEquals(routes['total']['p99'], 300)
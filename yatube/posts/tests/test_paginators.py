@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import CursorPaginator, DeepPage, FeedPaginator, cursor_for
+from ..templatetags.paginator_filters import page_window
+
+User = get_user_model()
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user("author")
+        Post.objects.bulk_create(
+            Post(text=f"Post {post_number}", author=cls.author)
+            for post_number in range(95))
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_count_is_cached(self):
+        FeedPaginator(Post.objects.all(), 10).count
+        with self.assertNumQueries(0):
+            self.assertEquals(FeedPaginator(Post.objects.all(), 10).count,
+                              95)
+
+    def test_count_is_bounded(self):
+        paginator = FeedPaginator(Post.objects.all(), 10)
+        paginator.count_limit = 50
+        self.assertEquals(paginator.count, 50)
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertEquals(len(paginator.page(5)), 10)
+
+    def test_pages_past_count(self):
+        paginator = FeedPaginator(Post.objects.all(), 10)
+        with self.assertRaises(EmptyPage):
+            paginator.page(11)
+        cache.clear()
+        paginator = FeedPaginator(Post.objects.all(), 10)
+        paginator.count_limit = 50
+        with self.assertRaises(DeepPage):
+            paginator.page(6)
+        self.assertEquals(paginator.get_page(6).number, 5)
+
+    def test_deep_pages_redirect_to_cursor(self):
+        self.assertEquals(
+            self.client.get(reverse('posts:index'), {'page': 999}).
+            status_code, 404)
+        cache.clear()
+        with mock.patch.object(FeedPaginator, 'count_limit', 50):
+            response = self.client.get(reverse('posts:index'),
+                                       {'page': 999})
+        last_counted = Post.objects.feed()[49]
+        self.assertRedirects(
+            response, reverse('posts:index') + '?after='
+            + cursor_for(last_counted))
+
+    def test_page_window(self):
+        paginator = FeedPaginator(Post.objects.all(), 10)
+        windows = {
+            1: [1, 2, 3],
+            5: [3, 4, 5, 6, 7],
+            10: [8, 9, 10],
+        }
+        for number, expected_window in windows.items():
+            with self.subTest(number=number):
+                self.assertEquals(paginator.get_page_window(number),
+                                  expected_window)
+
+    def test_page_window_filter(self):
+        paginator = FeedPaginator(Post.objects.all(), 10)
+        self.assertEquals(page_window(paginator.page(1)), [1, 2, 3])
+        cursor_page = CursorPaginator(Post.objects.all(), 10).page()
+        self.assertEquals(page_window(cursor_page), [])
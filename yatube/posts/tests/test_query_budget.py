@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import QUERY_BUDGET_SIZES, QueryBudgetMixin
+
+from .. import views
+from ..models import Follow, Group, Post
+from .utils import grow_posts
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Pages show size posts or comments for a dataset of size,
+    and still make the same number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+        cls.reader = User.objects.create_user("reader")
+        cls.group = Group.objects.create(title="Котики", slug="cats",
+                                         description="Про котиков")
+        cls.post = Post.objects.create(text="Обсуждаемый пост",
+                                       author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryBudgetTests.reader)
+
+    def populate(self, size):
+        grow_posts(size, QueryBudgetTests.author, QueryBudgetTests.group,
+                   QueryBudgetTests.reader, QueryBudgetTests.post)
+
+    def check_page(self, view_class, url, sizes=QUERY_BUDGET_SIZES,
+                   **params):
+        def request(size):
+            # На странице столько постов, сколько их в наборе данных
+            with mock.patch.object(view_class, 'paginate_by', size,
+                                   create=True):
+                response = self.client.get(url, params)
+            self.assertEquals(response.status_code, 200)
+
+        self.assertConstantQueries(request, self.populate, sizes, url)
+
+    def test_index(self):
+        self.check_page(views.IndexPageView, reverse('posts:index'))
+
+    def test_group_list(self):
+        self.check_page(views.GroupPageView,
+                        reverse('posts:group_list', args=['cats']))
+
+    def test_profile(self):
+        self.check_page(views.ProfilePageView,
+                        reverse('posts:profile', args=['author']))
+
+    def test_follow_index(self):
+        self.check_page(views.FollowIndexView, reverse('posts:follow_index'))
+
+    def test_search(self):
+        # Страница поиска больше 999 постов читается in_bulk в два
+        # запроса: столько переменных SQL не помещается в один
+        self.check_page(views.PostSearchView, reverse('posts:search'),
+                        sizes=(10, 100, 500), q='котиков')
+
+    def test_post_detail(self):
+        self.check_page(views.PostDetailView,
+                        reverse('posts:post_detail',
+                                args=[QueryBudgetTests.post.pk]))
+
+    def test_extra_queries_are_reported(self):
+        template = Template("{% for post in posts %}\n"
+                            "{{ post.author.username }}\n"
+                            "{% endfor %}")
+
+        def request(size):
+            template.render(Context({'posts': Post.objects.all()[:size]}))
+
+        with self.assertRaisesMessage(AssertionError,
+                                      '<unknown source>:2 x2: SELECT'):
+            self.assertConstantQueries(request, self.populate, sizes=(1, 3))
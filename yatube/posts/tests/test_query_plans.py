@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.query_plans import explain, plan_problems
+from ..models import Comment, Follow, Group, Post
+from ..paginators import cursor_for
+
+User = get_user_model()
+
+
+class FeedQueryPlansTests(TestCase):
+    """Queries of the feed pages must be served by indexes:
+    no full table scans and no sorting in temporary B-trees."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.follower = User.objects.create_user("follower")
+        cls.author = User.objects.create_user("author")
+        cls.group = Group.objects.create(
+            title="Test title",
+            slug="test_slug",
+            description="Test description"
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        for post_number in range(15):
+            Post.objects.create(text=f"Post {post_number}",
+                                author=cls.author,
+                                group=cls.group)
+        cls.post = Post.objects.all()[12]
+        Comment.objects.create(text="Comment",
+                               author=cls.follower,
+                               post=cls.post)
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(FeedQueryPlansTests.follower)
+
+    def test_feed_queries_use_indexes(self):
+        cursor = cursor_for(FeedQueryPlansTests.post)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    args=(FeedQueryPlansTests.group.slug,)),
+            reverse('posts:profile',
+                    args=(FeedQueryPlansTests.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail',
+                    args=(FeedQueryPlansTests.post.pk,)),
+        ]
+        urls += [f'{url}?page=2' for url in urls[:4]]
+        urls += [f'{url}?after={cursor}' for url in urls[:4]]
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            for query in context.captured_queries:
+                if 'posts_' not in query['sql']:
+                    continue
+                with self.subTest(url=url, sql=query['sql']):
+                    plan = explain(query['sql'])
+                    self.assertEquals(plan_problems(plan), [],
+                                      f"План запроса: {plan}")
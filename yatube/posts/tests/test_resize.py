@@ -0,0 +1,98 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..resize import ResizeCache, resized_image_url
+from .utils import create_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ResizedImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = Client()
+        cls.author = User.objects.create_user("author")
+        cls.post = Post.objects.create(text="Пост с картинкой",
+                                       author=cls.author,
+                                       image=create_image())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_pages_contain_srcset(self):
+        post = ResizedImageTests.post
+        response = ResizedImageTests.client.get(reverse('posts:index'))
+        self.assertContains(response,
+                            resized_image_url(post, 960, 339, fmt='webp'))
+        self.assertContains(response, resized_image_url(post, 480, 169))
+
+    def test_resized_image(self):
+        url = resized_image_url(ResizedImageTests.post, 120, 60,
+                                fmt='webp')
+        for attempt in ('resize', 'disk cache'):
+            with self.subTest(attempt=attempt):
+                response = ResizedImageTests.client.get(url)
+                self.assertEquals(response.status_code, 200)
+                self.assertEquals(response['Content-Type'], 'image/webp')
+                self.assertIn('immutable', response['Cache-Control'])
+                content = b''.join(response.streaming_content
+                                   if response.streaming
+                                   else [response.content])
+                with Image.open(io.BytesIO(content)) as image:
+                    self.assertEquals(image.size, (120, 60))
+
+    def test_wrong_signature(self):
+        url = resized_image_url(ResizedImageTests.post, 120, 60)
+        forged_url = url.replace('120x60', '2000x2000')
+        response = ResizedImageTests.client.get(forged_url)
+        self.assertEquals(response.status_code, 404)
+
+    def test_cache_evicts_least_recently_used(self):
+        directory = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        resize_cache = ResizeCache(directory, max_bytes=25)
+        paths = [resize_cache.path('ab' * 6, size, size, 'center', 'jpeg')
+                 for size in range(3)]
+        resize_cache.put(paths[0], b'0' * 10)
+        resize_cache.put(paths[1], b'1' * 10)
+        os.utime(paths[0], (0, 0))
+        resize_cache.open(paths[1]).close()
+        resize_cache.put(paths[2], b'2' * 10)
+
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+
+    def test_cache_is_walked_only_over_max_bytes(self):
+        directory = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        resize_cache = ResizeCache(directory, max_bytes=25, sweep_every=10)
+        paths = [resize_cache.path('cd' * 6, size, size, 'center', 'jpeg')
+                 for size in range(3)]
+        with mock.patch.object(ResizeCache, 'evict') as evict:
+            resize_cache.put(paths[0], b'0' * 10)
+            resize_cache.put(paths[1], b'1' * 10)
+            evict.assert_not_called()
+            resize_cache.put(paths[2], b'2' * 10)
+            evict.assert_called_once()
+
+        self.assertEquals(resize_cache.evict(), 20)
+        self.assertEquals(resize_cache.size, 20)
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Group, Post
+from ..search import install_search_after_migrate
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = Client()
+        cls.author = User.objects.create_user("author")
+        cls.other_author = User.objects.create_user("other_author")
+        cls.group = Group.objects.create(
+            title="Test title",
+            slug="test_slug",
+            description="Test description"
+        )
+        cls.relevant_post = Post.objects.create(
+            text="Котики, котики и ещё раз котики",
+            author=cls.author)
+        cls.group_posts = [
+            Post.objects.create(text=f"Пост {post_number} про котики",
+                                author=cls.other_author,
+                                group=cls.group)
+            for post_number in range(12)]
+        Post.objects.create(text="Пост про собак", author=cls.author)
+
+    def search(self, **params):
+        return (PostSearchTests.
+                client.
+                get(reverse('posts:search'), params).
+                context['page_obj'])
+
+    def test_search_ranks_results(self):
+        page = self.search(q='Котики')
+        self.assertEquals(page[0].pk, PostSearchTests.relevant_post.pk)
+        self.assertTrue(page.has_next())
+
+    def test_search_filters(self):
+        page = self.search(q='котики', author='author')
+        self.assertEquals([post.pk for post in page],
+                          [PostSearchTests.relevant_post.pk])
+
+        page = self.search(q='котики', group='test_slug')
+        self.assertNotIn(PostSearchTests.relevant_post, list(page))
+
+    def test_search_unknown_author(self):
+        response = PostSearchTests.client.get(
+            reverse('posts:search'), {'q': 'котики', 'author': 'nobody'})
+        self.assertEquals(response.status_code, 200)
+        self.assertFormError(response, 'form', 'author', 'Нет такого автора')
+        self.assertContains(response, 'Ничего не найдено')
+
+    def test_search_is_not_installed_without_posts_table(self):
+        with mock.patch.object(connection.introspection, 'table_names',
+                               return_value=[]), \
+                mock.patch('posts.search.install_search') as install:
+            install_search_after_migrate(sender=None)
+        install.assert_not_called()
+
+        install_search_after_migrate(sender=None)
+        self.assertEquals(len(self.search(q='котики', author='author')), 1)
+
+    def test_search_pagination(self):
+        page = self.search(q='котики')
+        found_posts = list(page)
+        while page.has_next():
+            page = self.search(q='котики', after=page.next_cursor)
+            found_posts += list(page)
+        self.assertEquals(len(found_posts),
+                          len(PostSearchTests.group_posts) + 1)
+        self.assertEquals(len(set(found_posts)), len(found_posts))
+
+    def test_search_index_follows_post_changes(self):
+        post = Post.objects.create(text="Уникальное слово",
+                                   author=PostSearchTests.author)
+        self.assertEquals(len(self.search(q='уникальное')), 1)
+
+        post.text = "Другой текст"
+        post.save()
+        self.assertEquals(len(self.search(q='уникальное')), 0)
+        self.assertEquals(len(self.search(q='другой')), 1)
+
+        post.delete()
+        self.assertEquals(len(self.search(q='другой')), 0)
+
+    def test_search_query_syntax_is_escaped(self):
+        response = PostSearchTests.client.get(reverse('posts:search'),
+                                              {'q': '"котики OR NEAR('})
+        self.assertEquals(response.status_code, 200)
+
+    def test_admin_search(self):
+        admin = PostAdmin(Post, AdminSite())
+        queryset, may_have_duplicates = admin.get_search_results(
+            None, Post.objects.all(), 'собак')
+        self.assertEquals(queryset.count(), 1)
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Post
+from ..storage import ContentHashStorage, post_image_storage
+from .utils import create_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user("author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_same_content_is_stored_once(self):
+        posts = [Post.objects.create(text=f"Пост {post_number}",
+                                     author=ContentHashStorageTests.author,
+                                     image=create_image())
+                 for post_number in range(2)]
+        self.assertEquals(posts[0].image.name, posts[1].image.name)
+
+        name = posts[0].image.name
+        directory, file_name = os.path.split(name)
+        content_hash = os.path.splitext(file_name)[0]
+        self.assertEquals(directory,
+                          f'posts/{content_hash[:2]}/{content_hash[2:4]}')
+        self.assertEquals(
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, directory)),
+            [file_name])
+
+    def test_saving_a_copy_refreshes_modified_time(self):
+        name = post_image_storage.save('posts/copy.txt',
+                                       ContentFile(b'copy'))
+        week_ago = time.time() - 7 * 24 * 60 * 60
+        os.utime(post_image_storage.path(name), (week_ago, week_ago))
+
+        self.assertEquals(post_image_storage.save('posts/copy.txt',
+                                                  ContentFile(b'copy')),
+                          name)
+        self.assertGreater(
+            os.path.getmtime(post_image_storage.path(name)), week_ago)
+
+    def test_collect_media_garbage_keeps_new_references(self):
+        orphan = post_image_storage.save('posts/orphan.txt',
+                                         ContentFile(b'adopted'))
+        walk = ContentHashStorage.walk
+
+        def walk_and_adopt(storage, directory):
+            # Пост сохраняется, пока команда обходит файлы
+            Post.objects.create(text="Новый пост",
+                                author=ContentHashStorageTests.author,
+                                image=orphan)
+            yield from walk(storage, directory)
+
+        with mock.patch.object(ContentHashStorage, 'walk', walk_and_adopt):
+            call_command('collect_media_garbage', '--grace-hours=0',
+                         stdout=StringIO())
+        self.assertTrue(post_image_storage.exists(orphan))
+
+    def test_collect_media_garbage(self):
+        post = Post.objects.create(text="Пост с картинкой",
+                                   author=ContentHashStorageTests.author,
+                                   image=create_image())
+        orphan = post_image_storage.save('posts/orphan.txt',
+                                         ContentFile(b'orphan'))
+
+        out = StringIO()
+        call_command('collect_media_garbage', '--grace-hours=0', stdout=out)
+        self.assertIn('Файлов без постов: 1', out.getvalue())
+        self.assertFalse(post_image_storage.exists(orphan))
+        self.assertTrue(post_image_storage.exists(post.image.name))
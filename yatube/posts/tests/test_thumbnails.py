@@ -0,0 +1,151 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Task
+from ..models import Post
+from ..templatetags.post_thumbnails import post_thumbnail
+from ..thumbnails import (POST_THUMBNAILS, backend,
+                          generate_post_thumbnails, prefetch_thumbnails)
+from .utils import create_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.client = Client()
+        cls.author = User.objects.create_user("author")
+        cls.post = Post.objects.create(text="Пост с картинкой",
+                                       author=cls.author,
+                                       image=create_image())
+        cls.text_post = Post.objects.create(text="Пост без картинки",
+                                            author=cls.author)
+        cls.image_posts = [cls.post] + [
+            Post.objects.create(text=f"Пост {post_number}",
+                                author=cls.author,
+                                image=create_image())
+            for post_number in range(5)]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_original_image_until_thumbnail_is_ready(self):
+        post = PostThumbnailsTests.post
+        image = post_thumbnail({}, post, 'card')
+        self.assertEquals(image.name, post.image.name)
+        self.assertEquals(image.size, [post.image_width, post.image_height])
+        self.assertIsNone(post_thumbnail({}, PostThumbnailsTests.text_post))
+
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=(post.pk,))):
+            with self.subTest(url=url):
+                response = PostThumbnailsTests.client.get(url)
+                self.assertContains(response, post.image.url)
+                self.assertContains(response, 'width="2" height="1"')
+                self.assertContains(response, 'loading="lazy"')
+
+    def test_image_metadata_is_stored_on_upload(self):
+        post = PostThumbnailsTests.post
+        self.assertEquals((post.image_width, post.image_height), (2, 1))
+        self.assertEquals(post.image_size, post.image.size)
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,'))
+
+        text_post = PostThumbnailsTests.text_post
+        self.assertIsNone(text_post.image_width)
+        self.assertEquals(text_post.image_placeholder, '')
+
+    def test_fill_image_metadata_command(self):
+        Post.objects.update(image_width=None, image_height=None,
+                            image_size=None, image_placeholder='')
+        out = StringIO()
+        call_command('fill_image_metadata', stdout=out)
+        self.assertIn(
+            f'Заполнено картинок: {len(PostThumbnailsTests.image_posts)}',
+            out.getvalue())
+        post = Post.objects.get(pk=PostThumbnailsTests.post.pk)
+        self.assertEquals((post.image_width, post.image_height), (2, 1))
+        self.assertNotEquals(post.image_placeholder, '')
+
+    def test_prefetch_thumbnails_reads_store_at_once(self):
+        posts = PostThumbnailsTests.image_posts
+        with CaptureQueriesContext(connection) as one_post_queries:
+            prefetch_thumbnails(posts[:1])
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails = prefetch_thumbnails(
+                posts + [PostThumbnailsTests.text_post])
+        self.assertEquals(len(queries), len(one_post_queries))
+        self.assertEquals(len(thumbnails), len(posts) * len(POST_THUMBNAILS))
+        self.assertEquals(set(thumbnails.values()), {None})
+
+        # Миниатюры поставлены в очередь при загрузке, отрисовка
+        # страницы в базу не пишет
+        self.assertEquals(
+            Task.objects.filter(
+                name=generate_post_thumbnails.task_name).count(),
+            len(posts))
+        Task.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            prefetch_thumbnails(posts)
+            PostThumbnailsTests.client.get(reverse('posts:index'))
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith(('INSERT', 'UPDATE'))])
+        self.assertFalse(Task.objects.exists())
+
+    def test_pregenerate_thumbnails_command(self):
+        Post.objects.exclude(image='').delete()
+        out = StringIO()
+        call_command('pregenerate_thumbnails', stdout=out)
+        self.assertIn('Постов с картинками: 0', out.getvalue())
+
+    def test_pregenerate_thumbnails_reports_failures(self):
+        out, err = StringIO(), StringIO()
+        with mock.patch('posts.management.commands.pregenerate_thumbnails.'
+                        'generate_post_thumbnails',
+                        side_effect=OSError('Нет файла')):
+            call_command('pregenerate_thumbnails', '--workers=1',
+                         '--chunk-size=4', stdout=out, stderr=err)
+        posts = PostThumbnailsTests.image_posts
+        self.assertIn(f'Постов с картинками: {len(posts)}, '
+                      f'с новыми миниатюрами: 0, ошибок: {len(posts)}',
+                      out.getvalue())
+        self.assertIn(f'Пост {posts[0].pk}: ', err.getvalue())
+
+    def test_ready_thumbnails_keep_generations(self):
+        post = PostThumbnailsTests.post
+        with mock.patch('posts.thumbnails.get_thumbnail') as make, \
+                mock.patch('posts.thumbnails.bump_post_generations') as bump, \
+                mock.patch.object(backend, 'get_ready_thumbnail',
+                                  return_value=None) as get_ready:
+            self.assertTrue(generate_post_thumbnails(post.pk))
+            self.assertEquals(make.call_count, len(POST_THUMBNAILS))
+            bump.assert_called_once()
+
+            make.reset_mock()
+            bump.reset_mock()
+            get_ready.return_value = post.image
+            self.assertFalse(generate_post_thumbnails(post.pk))
+            make.assert_not_called()
+            bump.assert_not_called()
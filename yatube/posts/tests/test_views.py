@@ -1,14 +1,23 @@
 import shutil
 import tempfile
+import time
+from io import StringIO
+from unittest import mock
 from django.conf import settings
 from django.test import TestCase, Client, override_settings
 from django.core.paginator import Page
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
+from ..feed_cache import FEED_CACHE_TIMEOUT, INDEX_SCOPE, get_generation
 from ..forms import CommentForm
-from ..models import Post, Group, Comment, Follow
+from ..paginators import cursor_for
+from ..models import (Post, Group, Comment, Follow, Profile,
+                      TimelineEntry)
 from django.urls import reverse
 from django import forms
 from test_utils.utils import (check_responses_of_given_urls,
@@ -96,6 +105,8 @@ class PostsPagesTests(TestCase):
                     author=cls.auth_user,
                     post=post
                 )
+        # Счётчик комментариев обновлён в базе
+        cls.test_post.refresh_from_db()
 
     def setUp(self) -> None:
         super().setUp()
@@ -240,6 +251,72 @@ class PostsPagesTests(TestCase):
                                        [:POSTS_PER_PAGE])
                 check_posts_fields(self, posts_from_page, posts_from_database)
 
+    def test_cursor_pagination(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    args=(PostsPagesTests.tests_groups[1].slug,)),
+            reverse('posts:profile',
+                    args=(PostsPagesTests.tests_authors[0].username,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first_page = (PostsPagesTests.auth_client.get(url).
+                              context['page_obj'])
+                posts_from_pages = list(first_page)
+                cursor = cursor_for(first_page[len(first_page) - 1])
+                while cursor:
+                    page = (PostsPagesTests.
+                            auth_client.
+                            get(url, {'after': cursor}).
+                            context['page_obj'])
+                    posts_from_pages += list(page)
+                    cursor = page.next_cursor
+
+                posts_from_database = list(PostsPagesTests.
+                                           auth_client.
+                                           get(url).
+                                           context['view'].
+                                           get_queryset())
+                compare_model_objects_list(self,
+                                           posts_from_pages,
+                                           posts_from_database,
+                                           ['id'])
+
+    def test_cursor_pagination_wrong_cursor(self):
+        response = PostsPagesTests.auth_client.get(reverse('posts:index'),
+                                                   {'after': 'wrong'})
+        self.assertEquals(response.status_code, 404)
+
+    def test_cursor_pagination_empty_cursor(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile',
+                    args=(PostsPagesTests.tests_authors[0].username,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = PostsPagesTests.auth_client.get(url,
+                                                           {'after': ''})
+                self.assertEquals(response.status_code, 200)
+                self.assertEquals(response.context['page_obj'].number, 1)
+
+    def test_feed_pages_query_count_does_not_depend_on_posts(self):
+        few_posts_url = reverse('posts:group_list',
+                                args=(PostsPagesTests.tests_groups[2].slug,))
+        many_posts_url = reverse('posts:group_list',
+                                 args=(PostsPagesTests.tests_groups[1].slug,))
+        queries_count = {}
+        for url in (few_posts_url, many_posts_url):
+            # Первый запрос прогревает кэш миниатюр
+            PostsPagesTests.guest_client.get(url)
+            with CaptureQueriesContext(connection) as context:
+                PostsPagesTests.guest_client.get(url)
+            queries_count[url] = len(context.captured_queries)
+
+        self.assertEquals(queries_count[few_posts_url],
+                          queries_count[many_posts_url])
+
     def test_new_post_creation(self):
         new_post_with_group = Post.objects.create(
             text="new_post",
@@ -311,24 +388,148 @@ class PostsPagesTests(TestCase):
         new_post = Post.objects.create(text='Post for cache testing',
                                        author=PostsPagesTests.auth_user)
 
-        response_before_post_deletion = get_index_page()
+        response_before_update = get_index_page()
 
-        Post.objects.get(id=new_post.id).delete()
-
-        response_after_post_deleiton = get_index_page()
+        # 1. Test cache work - update without signals keeps content
+        Post.objects.filter(id=new_post.id).update(text='Updated text')
+        response_after_update = get_index_page()
+        self.assertEquals(response_before_update.content,
+                          response_after_update.content)
 
-        # 1. Test cache work - content is the same
-        self.assertEquals(response_before_post_deletion.content,
-                          response_after_post_deleiton.content)
-
-        # 2. Drop cache
-        cache.clear()
+        # 2. Post deletion bumps the generation and drops the cache
+        Post.objects.get(id=new_post.id).delete()
+        response_after_post_deletion = get_index_page()
+        self.assertNotEquals(response_after_update.content,
+                             response_after_post_deletion.content)
+        self.assertNotIn(new_post.text.encode(),
+                         response_after_post_deletion.content)
+
+    def test_post_fragment_cache_is_invalidated_on_edit(self):
+        post = Post.objects.create(text='Post before edit',
+                                   group=PostsPagesTests.test_group,
+                                   author=PostsPagesTests.auth_user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    args=(PostsPagesTests.test_group.slug,)),
+            reverse('posts:profile',
+                    args=(PostsPagesTests.auth_user.username,)),
+        ]
+        for url in urls:
+            PostsPagesTests.auth_client.get(url)
 
-        response_after_cache_clear = get_index_page()
+        post.text = 'Post after edit'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                content = PostsPagesTests.auth_client.get(url).content
+                self.assertIn('Post after edit'.encode(), content)
+                self.assertNotIn('Post before edit'.encode(), content)
+
+    def test_fragment_cache_is_invalidated_on_group_and_name_edit(self):
+        # Копии из базы: изменения откатятся вместе с транзакцией теста
+        group = Group.objects.get(pk=PostsPagesTests.test_group.pk)
+        author = User.objects.get(pk=PostsPagesTests.auth_user.pk)
+        Post.objects.create(text='Post of renamed author', group=group,
+                            author=author)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+        ]
+        for url in urls:
+            PostsPagesTests.auth_client.get(url)
+
+        group.description = 'Renamed description'
+        group.save()
+        author.first_name, author.last_name = 'Renamed', 'Author'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                content = PostsPagesTests.auth_client.get(url).content
+                self.assertIn('Renamed Author'.encode(), content)
+        self.assertIn('Renamed description'.encode(),
+                      PostsPagesTests.auth_client.get(urls[1]).content)
+
+    def test_conditional_get(self):
+        post = Post.objects.create(text='Post for conditional get',
+                                   group=PostsPagesTests.test_group,
+                                   author=PostsPagesTests.auth_user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    args=(PostsPagesTests.test_group.slug,)),
+            reverse('posts:profile',
+                    args=(PostsPagesTests.auth_user.username,)),
+            reverse('posts:post_detail', args=(post.id,)),
+        ]
+        client = PostsPagesTests.auth_client
+        etags = {}
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                etags[url] = response['ETag']
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+        # Чужой пользователь не получает 304 по тегу другого
+        response = PostsPagesTests.guest_client.get(
+            urls[0], HTTP_IF_NONE_MATCH=etags[urls[0]])
+        self.assertEqual(response.status_code, 200)
+
+        # Комментарий меняет страницу поста, правка - все страницы
+        Comment.objects.create(text='New comment',
+                               author=PostsPagesTests.auth_user,
+                               post=post)
+        response = client.get(urls[-1], HTTP_IF_NONE_MATCH=etags[urls[-1]])
+        self.assertEqual(response.status_code, 200)
+
+        # Новый пост автора меняет счётчик в карточке автора
+        etags[urls[-1]] = response['ETag']
+        Post.objects.create(text='Another post for conditional get',
+                            author=PostsPagesTests.auth_user)
+        response = client.get(urls[-1], HTTP_IF_NONE_MATCH=etags[urls[-1]])
+        self.assertEqual(response.status_code, 200)
+
+        post.text = 'Edited for conditional get'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_follows_group_and_author_name(self):
+        group = PostsPagesTests.test_group
+        author = PostsPagesTests.auth_user
+        urls = [
+            reverse('posts:group_list', args=(group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:post_detail',
+                    args=(PostsPagesTests.test_post.id,)),
+        ]
+        client = PostsPagesTests.auth_client
+        etags = {url: client.get(url)['ETag'] for url in urls}
 
-        # 3. Test cache is dropped
-        self.assertNotEquals(response_after_post_deleiton.content,
-                             response_after_cache_clear.content)
+        # update() обходит сигналы: поколения лент не меняются
+        Group.objects.filter(pk=group.pk).update(title='Renamed group')
+        User.objects.filter(pk=author.pk).update(first_name='Renamed')
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_local_feed_generations_expire(self):
+        # Кэш в памяти процесса: изменения, замеченные другими
+        # процессами, видны не позже чем через FEED_CACHE_TIMEOUT
+        generation = get_generation(INDEX_SCOPE)
+        self.assertEquals(get_generation(INDEX_SCOPE), generation)
+        later = time.time() + FEED_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time',
+                        return_value=later):
+            self.assertNotEquals(get_generation(INDEX_SCOPE), generation)
 
     def test_follow_creation_and_removing_by_auth_user(self):
         follow_author = PostsPagesTests.tests_authors[0]
@@ -369,6 +570,95 @@ class PostsPagesTests(TestCase):
 
         self.assertEquals(author_folowers_count + 1, author.following.count())
 
+    def test_timeline_follows_subscriptions(self):
+        follower = PostsPagesTests.auth_user
+        author = PostsPagesTests.tests_authors[0]
+
+        def timeline_posts():
+            return set(TimelineEntry.
+                       objects.
+                       filter(user=follower).
+                       values_list('post_id', flat=True))
+
+        def followed_posts():
+            return set(Post.
+                       objects.
+                       filter(author__following__user=follower).
+                       values_list('pk', flat=True))
+
+        Follow.objects.create(user=follower, author=author)
+        Post.objects.create(author=author, text='timeline test')
+        self.assertEquals(timeline_posts(), followed_posts())
+
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEquals(timeline_posts(), followed_posts())
+
+        Follow.objects.filter(user=follower, author=author).delete()
+        self.assertEquals(timeline_posts(), followed_posts())
+
+    def test_follow_index_count_follows_timeline(self):
+        def count():
+            return (PostsPagesTests.
+                    auth_client.
+                    get(reverse('posts:follow_index')).
+                    context['paginator'].
+                    count)
+
+        author = PostsPagesTests.tests_authors[0]
+        followed = PostsPagesTests.tests_authors[2]
+        before = count()
+        post = Post.objects.create(author=followed, text='count test')
+        self.assertEquals(count(), before + 1)
+        post.delete()
+        self.assertEquals(count(), before)
+
+        Follow.objects.create(user=PostsPagesTests.auth_user, author=author)
+        following = before + author.posts.count()
+        self.assertEquals(count(), following)
+        Follow.objects.filter(user=PostsPagesTests.auth_user,
+                              author=author).delete()
+        self.assertEquals(count(), before)
+
+        Follow.objects.create(user=PostsPagesTests.auth_user, author=author)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEquals(count(), following)
+
+    def test_counters(self):
+        follower = PostsPagesTests.auth_user
+        author = PostsPagesTests.tests_authors[1]
+
+        def check_counters():
+            profile = (PostsPagesTests.
+                       auth_client.
+                       get(reverse('posts:profile', args=(author.username,))).
+                       context['profile'])
+            self.assertEquals(profile.posts_count, author.posts.count())
+            self.assertEquals(profile.followers_count,
+                              author.following.count())
+            self.assertEquals(profile.following_count,
+                              author.follower.count())
+
+        check_counters()
+        PostsPagesTests.auth_client.get(
+            reverse('posts:profile_follow', args=(author.username,)))
+        post = Post.objects.create(author=author, text='counters test')
+        check_counters()
+
+        PostsPagesTests.auth_client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            data={'text': 'comment'})
+        post.refresh_from_db()
+        self.assertEquals(post.comments_count, 1)
+
+        post.delete()
+        Follow.objects.filter(user=follower, author=author).delete()
+        check_counters()
+
+        Profile.objects.filter(user=author).update(posts_count=1000)
+        call_command('reconcile_counters', stdout=StringIO())
+        check_counters()
+
     def test_post_shows_to_followers(self):
         post_author = PostsPagesTests.tests_authors[0]
         follower = PostsPagesTests.auth_user
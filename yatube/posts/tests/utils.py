@@ -2,7 +2,7 @@ from django.test import TestCase
 from typing import Iterable, List
 from django.utils.crypto import get_random_string
 from django.db.models import Max
-from ..models import Group, Post
+from ..models import Comment, Group, Post, TimelineEntry
 from django.contrib.auth import get_user_model
 from django.core.paginator import Page
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -90,3 +90,24 @@ def get_not_used_username() -> str:
     while random_username in User.objects.values_list("username"):
         random_username = get_random_string(7)
     return random_username
+
+
+def grow_posts(size: int, author, group: Group, reader, commented: Post):
+    """Adds posts of the author in the group, their timeline entries
+    for the reader and comments of the commented post, until there
+    are size of each."""
+    existing = Post.objects.filter(author=author, group=group).count()
+    Post.objects.bulk_create(
+        Post(text=f"Пост про котиков {number}", author=author, group=group)
+        for number in range(existing, size))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user=reader, post_id=post_id, created=created)
+         for post_id, created in (Post.
+                                  objects.
+                                  filter(author=author).
+                                  values_list('pk', 'created'))),
+        ignore_conflicts=True)
+    existing = commented.comments.count()
+    Comment.objects.bulk_create(
+        Comment(post=commented, author=reader, text=f"Комментарий {number}")
+        for number in range(existing, size))
@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.tasks import QueueFull, task
+
+from .feed_cache import bump_post_generations
+from .models import Post
+
+# Миниатюры картинок постов: {имя: (геометрия, опции sorl-thumbnail)}.
+# Их заранее создают фоновые задачи, шаблоны только читают готовые
+POST_THUMBNAILS: Dict[str, Tuple[str, Dict]] = getattr(
+    settings, 'POST_THUMBNAILS',
+    {'card': ('960x339', {'crop': 'center', 'upscale': True})})
+THUMBNAIL_WORKERS: int = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """sorl-thumbnail backend able to look a thumbnail up
+    in the key value store without creating it."""
+
+    def get_thumbnail_file(self, file_, geometry_string: str,
+                           **options) -> ImageFile:
+        """Returns the ImageFile the thumbnail is (or will be) stored in."""
+        source = ImageFile(file_)
+        # Те же опции по умолчанию, что и в get_thumbnail: от них
+        # зависит имя файла миниатюры
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string: str,
+                            **options) -> Optional[ImageFile]:
+        return default.kvstore.get(
+            self.get_thumbnail_file(file_, geometry_string, **options))
+
+    def get_many_ready_thumbnails(self, thumbnails: Iterable[ImageFile]
+                                  ) -> Dict[str, ImageFile]:
+        """Looks the thumbnails up in the key value store at once.
+
+        Returns {thumbnail name: stored ImageFile} for the ready ones.
+        Database backed store is read with one cache multi-get and
+        one query for the cache misses, other stores one by one."""
+        kvstore = default.kvstore
+        empty = cached_db_kvstore.EMPTY_VALUE
+        if not isinstance(kvstore, cached_db_kvstore.KVStore):
+            found = (kvstore.get(thumbnail) for thumbnail in thumbnails)
+            return {image.name: image for image in found if image}
+
+        keys = {add_prefix(thumbnail.key): thumbnail
+                for thumbnail in thumbnails}
+        values = kvstore.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            stored = dict(KVStoreModel.
+                          objects.
+                          filter(key__in=missing).
+                          values_list('key', 'value'))
+            # Как и sorl: отсутствие записи тоже кэшируется
+            fetched = {key: stored.get(key, empty) for key in missing}
+            kvstore.cache.set_many(fetched,
+                                   sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(fetched)
+
+        ready = {}
+        for key, value in values.items():
+            if value != empty:
+                ready[keys[key].name] = deserialize_image_file(value)
+        return ready
+
+
+backend = ReadyThumbnailBackend()
+
+
+def get_ready_thumbnail(image, name: str) -> Optional[ImageFile]:
+    """Returns the named thumbnail of the image if it is already made."""
+    geometry, options = POST_THUMBNAILS[name]
+    return backend.get_ready_thumbnail(image, geometry, **options)
+
+
+def prefetch_thumbnails(posts: Iterable
+                        ) -> Dict[Tuple[int, str], Optional[ImageFile]]:
+    """Returns {(post pk, thumbnail name): thumbnail or None} for all
+    POST_THUMBNAILS of the posts images, read from the key value store
+    at once. None means the thumbnail is not made yet.
+
+    Only reads: thumbnails are queued when the image is uploaded, and
+    the missing ones are made by pregenerate_thumbnails."""
+    thumbnails = {}
+    for post in posts:
+        if not post.image:
+            continue
+        for name, (geometry, options) in POST_THUMBNAILS.items():
+            thumbnails[post.pk, name] = backend.get_thumbnail_file(
+                post.image, geometry, **options)
+
+    ready = backend.get_many_ready_thumbnails(thumbnails.values())
+    return {key: ready.get(thumbnail.name)
+            for key, thumbnail in thumbnails.items()}
+
+
+@task(max_attempts=3)
+def generate_post_thumbnails(post_id: int) -> bool:
+    """Makes the missing POST_THUMBNAILS of the post image and
+    invalidates cached fragments showing the original instead of them.
+
+    Returns True if any thumbnail was made."""
+    post = (Post.
+            objects.
+            only('image', 'author_id', 'group_id').
+            filter(pk=post_id).
+            first())
+    if post is None or not post.image:
+        return False
+    created = False
+    for geometry, options in POST_THUMBNAILS.values():
+        if backend.get_ready_thumbnail(post.image, geometry,
+                                       **options) is None:
+            get_thumbnail(post.image, geometry, **options)
+            created = True
+    # Готовые миниатюры уже в кэше: поколения не трогаются
+    if created:
+        bump_post_generations(post)
+    return created
+
+
+def _thumbnails_key(post) -> str:
+    # Новая картинка поста - новая задача
+    return f'thumbnails:{post.pk}:{post.image.name}'
+
+
+def schedule_thumbnails(post):
+    """Queues generation of the post thumbnails, once per image.
+
+    A full queue is not an error here: templates show the original
+    image until pregenerate_thumbnails makes the thumbnails."""
+    try:
+        generate_post_thumbnails.delay(post.pk,
+                                       idempotency_key=_thumbnails_key(post))
+    except QueueFull:
+        pass
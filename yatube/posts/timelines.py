@@ -0,0 +1,80 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.db.models import Q
+
+from .feed_cache import TIMELINES_SCOPE, bump_generations, timeline_scope
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = getattr(settings, 'TIMELINE_BATCH_SIZE', 1000)
+
+
+def fan_out_post(post: Post):
+    """Adds the post to the timelines of all author followers."""
+    followers = list(Follow.
+                     objects.
+                     filter(author_id=post.author_id).
+                     values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, created=post.created)
+         for user_id in followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+    bump_generations(*map(timeline_scope, followers))
+
+
+def bump_follower_timelines(author_id: int):
+    """Invalidates the timelines of the author followers, e.g. when
+    the author post is deleted with its timeline entries."""
+    followers = (Follow.
+                 objects.
+                 filter(author_id=author_id).
+                 values_list('user_id', flat=True))
+    bump_generations(*map(timeline_scope, followers.iterator()))
+
+
+def backfill_timeline(user_id: int, author_id: int):
+    """Adds all the author posts to the user timeline."""
+    posts = (Post.
+             objects.
+             filter(author_id=author_id).
+             values_list('pk', 'created'))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, created=created)
+         for post_id, created in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+    bump_generations(timeline_scope(user_id))
+
+
+def prune_timeline(user_id: int, author_id: int):
+    """Removes all the author posts from the user timeline."""
+    (TimelineEntry.
+     objects.
+     filter(user_id=user_id, post__author_id=author_id).
+     delete())
+    bump_generations(timeline_scope(user_id))
+
+
+def rebuild_timelines():
+    """Rebuilds all the timelines from the follows."""
+    TimelineEntry.objects.all().delete()
+    for user_id, author_id in (Follow.
+                               objects.
+                               values_list('user_id', 'author_id').
+                               iterator()):
+        backfill_timeline(user_id, author_id)
+    bump_generations(TIMELINES_SCOPE)
+
+
+def refresh_timelines(user_ids: Iterable[int] = (),
+                      author_ids: Iterable[int] = ()):
+    """Adds the missing posts to the timelines of the users and to the
+    timelines of the followers of the authors."""
+    follows = (Follow.
+               objects.
+               filter(Q(user_id__in=list(user_ids))
+                      | Q(author_id__in=list(author_ids))).
+               values_list('user_id', 'author_id'))
+    for user_id, author_id in follows.iterator():
+        backfill_timeline(user_id, author_id)
@@ -0,0 +1,73 @@
+import io
+
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image
+
+from .images import (MAX_IMAGE_BYTES, MAX_IMAGE_PIXELS, too_large_message,
+                     too_many_pixels_message)
+
+# Сколько начальных байт файла копить, чтобы прочитать заголовок
+# картинки: у JPEG перед размерами может идти EXIF до 64 КБ
+IMAGE_HEADER_BYTES = 256 * 1024
+
+
+class LimitedImageUploadHandler(FileUploadHandler):
+    """Upload handler rejecting too big images while they stream in.
+
+    Stands before the storing handlers and passes chunks on unchanged.
+    The upload is skipped as soon as it exceeds max_bytes, or as soon
+    as its header shows more than max_pixels, so nothing big is stored
+    or decoded. Rejection reasons are put into request.upload_errors
+    by field name, for the form to show them."""
+
+    def __init__(self, request=None, max_bytes: int = MAX_IMAGE_BYTES,
+                 max_pixels: int = MAX_IMAGE_PIXELS):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.header_checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject(too_large_message())
+        if not self.header_checked:
+            self.header += raw_data
+            self.check_header()
+        return raw_data
+
+    def check_header(self):
+        try:
+            # Image.open читает только заголовок, пиксели не декодируются
+            with Image.open(io.BytesIO(self.header)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject(too_many_pixels_message())
+        except (OSError, SyntaxError, ValueError):
+            # Заголовок ещё не пришёл целиком или это не картинка:
+            # тогда её отвергнет проверка формы
+            if len(self.header) >= IMAGE_HEADER_BYTES:
+                self.header_checked = True
+                self.header = b''
+            return
+
+        self.header_checked = True
+        self.header = b''
+        if width * height > self.max_pixels:
+            self.reject(too_many_pixels_message())
+
+    def reject(self, message: str):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+    def file_complete(self, file_size):
+        # Файл соберут следующие обработчики
+        return None
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
@@ -7,6 +7,17 @@ urlpatterns = [
     # Последние обновления
     path('', views.IndexPageView.as_view(), name='index'),
 
+    # RSS и Atom: сайт целиком, группа, автор
+    path('feed/rss/', feeds.IndexFeed(), name='index_rss'),
+    path('feed/atom/', feeds.IndexAtomFeed(), name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.GroupFeed(), name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.GroupAtomFeed(),
+         name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.AuthorFeed(),
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.AuthorAtomFeed(),
+         name='profile_atom'),
+
     # Посты группы
     path("group/<slug:slug>/",
          views.GroupPageView.as_view(),
@@ -36,6 +47,18 @@ urlpatterns = [
         views.AddCommentView.as_view(),
         name='add_comment'),
 
+    # Картинка поста нужного размера по подписанной ссылке
+    path('img/<str:signature>/<int:post_id>/<str:version>/'
+         '<int:width>x<int:height>-<slug:crop>.<slug:fmt>',
+         views.ResizedImageView.as_view(),
+         name='resized_image'),
+
+    # Выгрузка постов и подписок для персонала
+    path('export/', views.ExportView.as_view(), name='export'),
+
+    # Поиск по постам
+    path('search/', views.PostSearchView.as_view(), name='search'),
+
     # Страница постов из подписок
     path('follow/',
          views.FollowIndexView.as_view(),
@@ -1,9 +1,15 @@
-from django.core.paginator import Paginator, Page
+from django.core.paginator import Page
+from django.db.models import QuerySet
+
+from .paginators import CursorPaginator, FeedPaginator
 
 
 def get_page(request, items, objects_per_page: int = 10) -> Page:
     """Returns Paginator Page from given HTTP request and items sequence.
 
+    If the request has ``after`` parameter and items is a QuerySet,
+    returns keyset paginated CursorPage instead of numbered one.
+
     Parameters
     ---------------
     request: Django request object
@@ -11,6 +17,10 @@ def get_page(request, items, objects_per_page: int = 10) -> Page:
     with a count() or __len__() method.
     objects_per_page: The maximum number of items to include on a page,
     """
+    cursor = request.GET.get('after')
+    if cursor and isinstance(items, QuerySet):
+        return CursorPaginator(items, objects_per_page).get_page(cursor)
+
     page_number = request.GET.get('page', 1)
-    paginator = Paginator(items, objects_per_page)
+    paginator = FeedPaginator(items, objects_per_page)
     return paginator.get_page(page_number)
@@ -1,83 +1,204 @@
 from django.shortcuts import redirect, get_object_or_404
-from .models import Follow, Post, Group, Comment
-from .forms import PostForm, CommentForm
+from .models import Follow, Post, Group, Comment, TimelineEntry
+from .forms import PostForm, CommentForm, SearchForm
 from django.contrib.auth import get_user_model
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import (LoginRequiredMixin,
+                                        UserPassesTestMixin)
 from django.views.generic import CreateView, UpdateView, ListView, DetailView
-from django.views.generic import View
+from django.views.generic import View, TemplateView
 from django.views.generic.edit import BaseCreateView
 from django.urls import reverse
+from django.db import transaction
+from .counters import get_profile
+from .exporter import iter_export
+from .mixins import (ConditionalGetMixin, CursorPaginationMixin,
+                     FeedCacheMixin, LimitedImageUploadMixin)
+from .feed_cache import (FEED_CACHE_TIMEOUT, INDEX_SCOPE, TIMELINES_SCOPE,
+                         group_scope, profile_scope, post_scope,
+                         timeline_scope, get_generation, get_generations,
+                         get_post_generations, generation_time)
+from .paginators import FeedPaginator
+from .images import IMAGE_ERRORS
+from .resize import (CROPS, FORMATS, RESIZE_MAX_AGE, RESIZE_MAX_SIDE,
+                     check_resize_signature, get_resize_cache,
+                     image_version, resize_image)
+from .search import SearchPaginator
+from .thumbnails import prefetch_thumbnails
+from django.core.paginator import InvalidPage
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, cached_property
 
 User = get_user_model()
 
 
-class IndexPageView(ListView):
+def feed_validators(posts, scope):
+    """Validators of a feed page: the feed generation, bumped by edits
+    and deletions, and the newest post creation date, read by index."""
+    generation = get_generation(scope)
+    newest = (posts.
+              order_by('-created', '-pk').
+              values_list('created', flat=True).
+              first())
+    last_modified = generation_time(generation)
+    if newest is not None:
+        last_modified = max(last_modified, newest)
+    return [generation, newest], last_modified
+
+
+class IndexPageView(ConditionalGetMixin,
+                    FeedCacheMixin,
+                    CursorPaginationMixin,
+                    ListView):
     model = Post
     allow_empty: bool = True
     template_name: str = 'posts/index.html'
     paginate_by: int = 10
+    paginator_class = FeedPaginator
+
+    def get_queryset(self):
+        return Post.objects.feed()
+
+    def get_cache_scope(self):
+        return INDEX_SCOPE
+
+    def get_validators(self):
+        return feed_validators(Post.objects.all(), INDEX_SCOPE)
 
 
-class GroupPageView(ListView):
+class GroupPageView(ConditionalGetMixin,
+                    FeedCacheMixin,
+                    CursorPaginationMixin,
+                    ListView):
     model = Post
     allow_empty: bool = True
     template_name: str = 'posts/group_list.html'
     paginate_by: int = 10
+    paginator_class = FeedPaginator
+
+    @cached_property
+    def group(self):
+        return get_object_or_404(Group, slug=self.kwargs['slug'])
 
     def get_queryset(self):
-        self.group = get_object_or_404(Group, slug=self.kwargs['slug'])
-        group_posts = self.group.posts.all()
+        group_posts = self.group.posts.feed()
         return group_posts
 
+    def get_cache_scope(self):
+        return group_scope(self.group.pk)
+
+    def get_validators(self):
+        values, last_modified = feed_validators(self.group.posts.all(),
+                                                self.get_cache_scope())
+        # Шапку ленты можно поменять и без изменения постов
+        values += [self.group.title, self.group.description]
+        return values, last_modified
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['group'] = self.group
         return context
 
 
-class ProfilePageView(ListView):
+class ProfilePageView(ConditionalGetMixin,
+                      FeedCacheMixin,
+                      CursorPaginationMixin,
+                      ListView):
     model = Post
     allow_empty: bool = True
     template_name: str = 'posts/profile.html'
     paginate_by: int = 10
+    paginator_class = FeedPaginator
+
+    @cached_property
+    def author(self):
+        return get_object_or_404(User, username=self.kwargs['username'])
+
+    @cached_property
+    def profile_user_is_in_followings(self):
+        return (Follow.
+                objects.
+                filter(user__id=self.request.user.id).
+                filter(author=self.author).exists())
 
     def get_queryset(self):
-        self.author = get_object_or_404(User,
-                                        username=self.kwargs['username'])
-        author_posts = self.author.posts.all()
+        author_posts = self.author.posts.feed()
         return author_posts
 
+    def get_cache_scope(self):
+        return profile_scope(self.author.pk)
+
+    def get_validators(self):
+        values, last_modified = feed_validators(self.author.posts.all(),
+                                                self.get_cache_scope())
+        # Имя, счётчики и кнопка подписки меняются без изменения постов
+        profile = get_profile(self.author)
+        values += [self.author.get_full_name(),
+                   profile.followers_count,
+                   profile.following_count,
+                   self.profile_user_is_in_followings]
+        return values, last_modified
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        profile_user_is_in_followings = (Follow.
-                                         objects.
-                                         filter(user__id=self.request.user.id).
-                                         filter(author=self.author).exists())
-
         context['author'] = self.author
-        context['following'] = profile_user_is_in_followings
+        context['profile'] = get_profile(self.author)
+        context['following'] = self.profile_user_is_in_followings
         return context
 
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, DetailView):
     template_name = 'posts/post_detail.html'
     model = Post
     context_object_name = 'post'
     pk_url_kwarg = 'post_id'
 
+    def get_validators(self):
+        post_id = self.kwargs['post_id']
+        post = get_object_or_404(Post.
+                                 objects.
+                                 filter(pk=post_id).
+                                 values('created', 'text', 'group_id',
+                                        'image', 'comments_count',
+                                        # Показывается в карточке автора
+                                        'author__profile__posts_count',
+                                        'author__first_name',
+                                        'author__last_name',
+                                        'group__title', 'group__slug'))
+        newest_comment = (Comment.
+                          objects.
+                          filter(post_id=post_id).
+                          aggregate(newest=Max('created'))['newest'])
+        # Поколение поста меняется при правке и комментариях
+        generation = get_generation(post_scope(post_id))
+        values = [generation, newest_comment, post]
+        last_modified = max(filter(None, (post['created'],
+                                          newest_comment,
+                                          generation_time(generation))))
+        return values, last_modified
+
+    def get_queryset(self):
+        return Post.objects.select_related('author', 'group')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["form"] = CommentForm()
-        context['comments'] = self.get_object().comments.all()
+        context['comments'] = self.object.comments.select_related('author')
+        context['author_profile'] = get_profile(self.object.author)
         return context
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class PostCreateView(LimitedImageUploadMixin,
+                     LoginRequiredMixin,
+                     CreateView):
     template_name = 'posts/create_post.html'
     model = Post
     form_class = PostForm
     context_object_name = "form"
 
+    @transaction.atomic
     def form_valid(self, form):
         post = form.save(commit=False)
         post.author = self.request.user
@@ -85,7 +206,9 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         return redirect('posts:profile', username=self.request.user.username)
 
 
-class PostEditView(LoginRequiredMixin, UpdateView):
+class PostEditView(LimitedImageUploadMixin,
+                   LoginRequiredMixin,
+                   UpdateView):
     model = Post
     template_name = 'posts/create_post.html'
     form_class = PostForm
@@ -115,6 +238,7 @@ class AddCommentView(LoginRequiredMixin, BaseCreateView):
     model = Comment
     form_class = CommentForm
 
+    @transaction.atomic
     def form_valid(self, form):
         post = get_object_or_404(Post, pk=self.kwargs['post_id'])
         comment = form.save(commit=False)  # type: Comment
@@ -125,6 +249,7 @@ class AddCommentView(LoginRequiredMixin, BaseCreateView):
 
 
 class FollowView(LoginRequiredMixin, View):
+    @transaction.atomic
     def get(self, request, username):
 
         author = get_object_or_404(User, username=username)
@@ -135,21 +260,135 @@ class FollowView(LoginRequiredMixin, View):
         return redirect('posts:profile', username=username)
 
 
-class FollowIndexView(LoginRequiredMixin, ListView):
+class FollowIndexView(LoginRequiredMixin,
+                      FeedCacheMixin,
+                      CursorPaginationMixin,
+                      ListView):
     model = Post
     allow_empty: bool = True
     template_name: str = 'posts/follow.html'
     paginate_by: int = 10
+    paginator_class = FeedPaginator
+
+    cursor_seek_fields = ('created', 'post_id')
 
     def get_queryset(self):
-        return (Post.
+        return (TimelineEntry.
                 objects.
-                filter(author__following__user=self.request.user))
+                feed().
+                filter(user=self.request.user).
+                order_by('-created', '-post_id'))
+
+    def get_cache_scope(self):
+        return timeline_scope(self.request.user.pk)
+
+    @cached_property
+    def feed_generation(self):
+        # Поколения - время изменения: наибольшее меняется
+        # и с лентой пользователя, и при перестройке всех лент
+        return max(get_generations([TIMELINES_SCOPE,
+                                    self.get_cache_scope()]).values())
+
+    def get_page_objects(self, object_list):
+        return [entry.post for entry in object_list]
 
 
 class UnfollowView(LoginRequiredMixin, View):
+    @transaction.atomic
     def get(self, request, username):
         author = get_object_or_404(User, username=username)
         follows = Follow.objects.filter(user=request.user, author=author)
         follows.delete()
         return redirect('posts:profile', username=author)
+
+
+class PostSearchView(TemplateView):
+    template_name = 'posts/search.html'
+    paginate_by: int = 10
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = SearchForm(self.request.GET or None)
+        context['form'] = form
+        if not form.is_valid():
+            return context
+
+        group = form.cleaned_data['group']
+        paginator = SearchPaginator(form.cleaned_data['q'],
+                                    self.paginate_by,
+                                    group_id=group.pk if group else None,
+                                    author_id=form.cleaned_data['author'])
+        try:
+            page = paginator.page(self.request.GET.get('after'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+
+        query = self.request.GET.copy()
+        query.pop('after', None)
+        context['page_obj'] = page
+        context['post_generations'] = get_post_generations(page)
+        context['post_thumbnails'] = SimpleLazyObject(
+            lambda: prefetch_thumbnails(page))
+        context['feed_cache_timeout'] = FEED_CACHE_TIMEOUT
+        context['query_string'] = query.urlencode()
+        return context
+
+
+class ResizedImageView(View):
+    """Serves the post image resized by a signed URL, see posts.resize.
+
+    Resized copies are kept in the disk cache, URLs change with
+    the image, so responses are cached by clients forever."""
+
+    def get(self, request, signature, post_id, version, width, height,
+            crop, fmt):
+        args = (post_id, version, width, height, crop, fmt)
+        if (crop not in CROPS
+                or fmt not in FORMATS
+                or not 0 < width <= RESIZE_MAX_SIDE
+                or not 0 < height <= RESIZE_MAX_SIDE
+                or not check_resize_signature(signature, *args)):
+            raise Http404('Неверная ссылка на картинку')
+
+        content_type = FORMATS[fmt][1]
+        cache = get_resize_cache()
+        path = cache.path(version, width, height, crop, fmt)
+        cached = cache.open(path)
+        if cached is not None:
+            response = FileResponse(cached, content_type=content_type)
+        else:
+            image_name = (Post.
+                          objects.
+                          filter(pk=post_id).
+                          values_list('image', flat=True).
+                          first())
+            if not image_name or image_version(image_name) != version:
+                raise Http404('Картинка поста изменилась')
+            storage = Post._meta.get_field('image').storage
+            try:
+                with storage.open(image_name) as source:
+                    content = resize_image(source, width, height, crop, fmt)
+            except IMAGE_ERRORS:
+                raise Http404('Картинка не читается')
+            cache.put(path, content)
+            response = HttpResponse(content, content_type=content_type)
+
+        response['Cache-Control'] = (f'public, max-age={RESIZE_MAX_AGE}, '
+                                     f'immutable')
+        return response
+
+
+class ExportView(UserPassesTestMixin, View):
+    """Streams the gzipped JSONL export of posts and the social graph
+    to staff, see posts.exporter."""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        response = StreamingHttpResponse(iter_export(),
+                                         content_type='application/gzip')
+        filename = f'yatube-{timezone.now():%Y%m%d}.jsonl.gz'
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
@@ -1,6 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from core.tasks import QueueFull
+from .tasks import send_password_reset_email
+
 User = get_user_model()
 
 
@@ -8,3 +11,24 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Password reset form handing the email over to the task queue,
+    so the request does not wait for the mail backend.
+
+    Only the user id and the site go to the queue, the reset link is
+    made by the task."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        arguments = (context['user'].pk, context['domain'],
+                     context['site_name'], context['protocol'] == 'https',
+                     subject_template_name, email_template_name,
+                     from_email, html_email_template_name)
+        try:
+            send_password_reset_email.delay(*arguments)
+        except QueueFull:
+            # Письмо важнее очереди: отправляется сразу
+            send_password_reset_email(*arguments)
@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
 from django.test import TestCase, Client
+from core.models import Task
+from core.tasks import drain_tasks
 from django.urls import reverse
 
 User = get_user_model()
@@ -41,3 +45,22 @@ class UsersFormsTest(TestCase):
         )
 
         self.assertTrue(new_user.exists())
+
+    def test_password_reset_email_is_sent_by_task(self):
+        user = User.objects.create_user('reset_user',
+                                        email='reset@reset.com',
+                                        password='Cegthfdhjkm123.')
+        response = UsersFormsTest.guest_client.post(
+            reverse('users:password_reset_form'),
+            data={'email': 'reset@reset.com'})
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEquals(len(mail.outbox), 0)
+        # В очереди нет ни письма, ни ссылки сброса
+        arguments = Task.objects.get().arguments
+        self.assertNotIn(default_token_generator.make_token(user), arguments)
+        self.assertNotIn('/auth/reset/', arguments)
+
+        self.assertEquals(drain_tasks(), 1)
+        self.assertEquals(len(mail.outbox), 1)
+        self.assertEquals(mail.outbox[0].to, ['reset@reset.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
@@ -9,6 +9,7 @@ from django.contrib.auth.views import (LogoutView,
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -45,7 +46,8 @@ urlpatterns = [
     path
     ('password_reset/',
      PasswordResetView.as_view(template_name=(
-                               'users/password_reset_form.html')),
+                               'users/password_reset_form.html'),
+                               form_class=QueuedPasswordResetForm),
      name='password_reset_form'),
 
     path
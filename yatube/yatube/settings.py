@@ -66,6 +66,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # Первым: время ответа учитывает остальные middleware
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -154,12 +157,18 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш в памяти процесса: с ним кэш лент живёт недолго, см.
+# posts.feed_cache. Для нескольких процессов нужен общий кэш
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Запросы к базе дольше стольких секунд пишутся в журнал
+# core.slow_queries с планом выполнения. None - журнал выключен
+SLOW_QUERY_THRESHOLD = None
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ] 
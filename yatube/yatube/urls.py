@@ -3,16 +3,20 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.handler_403'
 handler500 = 'core.views.handler_500'
 
 urlpatterns = [
     path('', include('posts.urls')),
+    path('api/v1/', include('posts.api_urls')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
-    path('about/', include('about.urls'))
+    path('about/', include('about.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG: